@@ -0,0 +1,284 @@
+"""Chords and notes of every analyzed stem in one indexed SQLite database.
+
+    python analysis_store.py migrate [--output output/htdemucs_6s]
+    python analysis_store.py chords [--song <folder>] [--stem guitar] [--limit 20]
+    python analysis_store.py note 60 [--song <folder>] [--stem guitar] [--limit 20]
+"""
+import argparse
+import csv
+import os
+import re
+import threading
+import time
+
+from sqlite_store import SQLiteStore
+
+ANALYSIS_DB_PATH = os.environ.get("TRACKAI_ANALYSIS_DB", "cache/analysis.sqlite")
+CHORDS_SUFFIX = "_filtered_chords.csv"
+NOTES_SUFFIX = "_notes.csv"
+
+
+def stem_from_csv(path, suffix):
+    """Returns the (song, stem) a per-stem CSV such as ``<song>/midi/guitar_filtered_chords.csv`` belongs to."""
+    folder = os.path.dirname(os.path.normpath(path))
+    if os.path.basename(folder) == "midi":
+        folder = os.path.dirname(folder)
+    return os.path.basename(folder), os.path.basename(path)[:-len(suffix)]
+
+
+def parse_notes(text):
+    """Reads the MIDI note numbers of a CSV notes cell, e.g. "(48, 52, 55)"."""
+    return [int(note) for note in re.findall(r"\d+", text)]
+
+
+class AnalysisStore(SQLiteStore):
+    """Per-stem chords and notes, queryable within a song and across the whole catalog.
+
+    A stem is identified by its song (the song's stem folder, as used in URLs
+    and event channels) and its name. Its chords are stored in order with the
+    time of the chord's first onset and the predicted label, and each chord's
+    notes as one row per note, so chords can be found by the notes they hold.
+    Its notes are stored in onset order with their times. Re-analyzing a stem
+    replaces its rows in one transaction; removing a stem cascades to them.
+    Rows imported from the older CSV files have no times.
+    """
+
+    def __init__(self, path=ANALYSIS_DB_PATH):
+        super().__init__(path)
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stems (
+                    id INTEGER PRIMARY KEY,
+                    song TEXT NOT NULL,
+                    stem TEXT NOT NULL,
+                    analyzed_at REAL NOT NULL,
+                    UNIQUE (song, stem)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chords (
+                    stem_id INTEGER NOT NULL REFERENCES stems (id) ON DELETE CASCADE,
+                    seq INTEGER NOT NULL,
+                    time_us INTEGER,
+                    chord TEXT NOT NULL,
+                    PRIMARY KEY (stem_id, seq)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chord_notes (
+                    stem_id INTEGER NOT NULL,
+                    seq INTEGER NOT NULL,
+                    note INTEGER NOT NULL,
+                    PRIMARY KEY (stem_id, seq, note),
+                    FOREIGN KEY (stem_id, seq) REFERENCES chords (stem_id, seq) ON DELETE CASCADE
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS notes (
+                    stem_id INTEGER NOT NULL REFERENCES stems (id) ON DELETE CASCADE,
+                    seq INTEGER NOT NULL,
+                    time_us INTEGER,
+                    note INTEGER NOT NULL,
+                    PRIMARY KEY (stem_id, seq)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS chords_chord ON chords (chord, stem_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS chord_notes_note ON chord_notes (note, stem_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS notes_note ON notes (note, stem_id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def save_stem(self, song, stem, chords, notes):
+        """Replaces a stem's analysis; ``chords`` are (time_us, notes, label) and ``notes`` (time_us, note) rows."""
+        with self.transaction() as conn:
+            self._replace(conn, song, stem, chords, notes)
+
+    @staticmethod
+    def _replace(conn, song, stem, chords, notes):
+        row = conn.execute("SELECT id FROM stems WHERE song = ? AND stem = ?", (song, stem)).fetchone()
+        if row:
+            # Cascades to the chords' notes
+            conn.execute("DELETE FROM chords WHERE stem_id = ?", row)
+            conn.execute("DELETE FROM notes WHERE stem_id = ?", row)
+            conn.execute("UPDATE stems SET analyzed_at = ? WHERE id = ?", (time.time(), row[0]))
+            stem_id = row[0]
+        else:
+            stem_id = conn.execute("INSERT INTO stems (song, stem, analyzed_at) VALUES (?, ?, ?)",
+                                   (song, stem, time.time())).lastrowid
+        chords = list(chords)
+        conn.executemany("INSERT INTO chords (stem_id, seq, time_us, chord) VALUES (?, ?, ?, ?)",
+                         ((stem_id, seq, time_us, str(label)) for seq, (time_us, _, label) in enumerate(chords)))
+        conn.executemany("INSERT OR IGNORE INTO chord_notes (stem_id, seq, note) VALUES (?, ?, ?)",
+                         ((stem_id, seq, int(note)) for seq, (_, chord_notes, _) in enumerate(chords)
+                          for note in chord_notes))
+        conn.executemany("INSERT INTO notes (stem_id, seq, time_us, note) VALUES (?, ?, ?, ?)",
+                         ((stem_id, seq, time_us, int(note)) for seq, (time_us, note) in enumerate(notes)))
+
+    def remove_stem(self, song, stem):
+        """Drops a stem with its chords and notes."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM stems WHERE song = ? AND stem = ?", (song, stem))
+
+    def has_stem(self, song, stem):
+        """Checks whether a stem's analysis is stored."""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM stems WHERE song = ? AND stem = ?", (song, stem)).fetchone() is not None
+
+    def stems(self, song=None):
+        """Lists the stored (song, stem) pairs, optionally of one song."""
+        with self._lock:
+            if song is None:
+                return self._conn.execute("SELECT song, stem FROM stems ORDER BY song, stem").fetchall()
+            return self._conn.execute("SELECT song, stem FROM stems WHERE song = ? ORDER BY stem", (song,)).fetchall()
+
+    def chords(self, song, stem):
+        """Returns a stem's (notes, chord, time_us) rows in order, ``notes`` being a tuple of MIDI note numbers."""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT chords.seq, chords.chord, chords.time_us FROM chords JOIN stems ON stems.id = chords.stem_id
+                WHERE stems.song = ? AND stems.stem = ? ORDER BY chords.seq
+            """, (song, stem)).fetchall()
+            chord_notes = {}
+            for seq, note in self._conn.execute("""
+                SELECT chord_notes.seq, chord_notes.note FROM chord_notes JOIN stems ON stems.id = chord_notes.stem_id
+                WHERE stems.song = ? AND stems.stem = ? ORDER BY chord_notes.seq, chord_notes.note
+            """, (song, stem)):
+                chord_notes.setdefault(seq, []).append(note)
+        return [(tuple(chord_notes.get(seq, ())), chord, time_us) for seq, chord, time_us in rows]
+
+    def notes(self, song, stem):
+        """Returns a stem's (note, time_us) rows in order."""
+        with self._lock:
+            return self._conn.execute("""
+                SELECT notes.note, notes.time_us FROM notes JOIN stems ON stems.id = notes.stem_id
+                WHERE stems.song = ? AND stems.stem = ? ORDER BY notes.seq
+            """, (song, stem)).fetchall()
+
+    def chord_frequency(self, song=None, stem=None, limit=None):
+        """Counts predicted chords, across the catalog or within a song and/or stem, most frequent first."""
+        where, params = self._scope(song, stem)
+        with self._lock:
+            return self._conn.execute(f"""
+                SELECT chords.chord, COUNT(*) AS count FROM chords JOIN stems ON stems.id = chords.stem_id
+                {where} GROUP BY chords.chord ORDER BY count DESC, chords.chord LIMIT ?
+            """, (*params, -1 if limit is None else limit)).fetchall()
+
+    def note_frequency(self, song=None, stem=None):
+        """Counts notes, across the catalog or within a song and/or stem, by MIDI note number."""
+        where, params = self._scope(song, stem)
+        with self._lock:
+            return self._conn.execute(f"""
+                SELECT notes.note, COUNT(*) FROM notes JOIN stems ON stems.id = notes.stem_id
+                {where} GROUP BY notes.note ORDER BY notes.note
+            """, params).fetchall()
+
+    def songs_with_chord(self, chord, limit=None):
+        """Lists the (song, stem, occurrences) that contain a predicted chord, most occurrences first."""
+        with self._lock:
+            return self._conn.execute("""
+                SELECT stems.song, stems.stem, COUNT(*) AS count FROM chords JOIN stems ON stems.id = chords.stem_id
+                WHERE chords.chord = ? GROUP BY chords.stem_id ORDER BY count DESC LIMIT ?
+            """, (chord, -1 if limit is None else limit)).fetchall()
+
+    def chords_with_note(self, note, song=None, stem=None, limit=None):
+        """Lists every chord holding a MIDI note as (song, stem, time_us, chord), across the catalog or within a song and/or stem."""
+        where, params = self._scope(song, stem)
+        where = f"{where} AND chord_notes.note = ?" if where else "WHERE chord_notes.note = ?"
+        with self._lock:
+            return self._conn.execute(f"""
+                SELECT stems.song, stems.stem, chords.time_us, chords.chord FROM chord_notes
+                JOIN chords ON chords.stem_id = chord_notes.stem_id AND chords.seq = chord_notes.seq
+                JOIN stems ON stems.id = chord_notes.stem_id
+                {where} ORDER BY stems.song, stems.stem, chords.seq LIMIT ?
+            """, (*params, int(note), -1 if limit is None else limit)).fetchall()
+
+    @staticmethod
+    def _scope(song, stem):
+        clauses = [(column, value) for column, value in (("stems.song", song), ("stems.stem", stem)) if value is not None]
+        where = "WHERE " + " AND ".join(f"{column} = ?" for column, _ in clauses) if clauses else ""
+        return where, [value for _, value in clauses]
+
+    def import_csvs(self, song, stem, chords_csv=None, notes_csv=None):
+        """Stores a stem from its older chords and notes CSV files; returns False when neither exists."""
+        if not any(path and os.path.exists(path) for path in (chords_csv, notes_csv)):
+            return False
+        chords, notes = [], []
+        if chords_csv and os.path.exists(chords_csv):
+            with open(chords_csv, newline='', encoding='utf-8') as f:
+                chords = [(None, parse_notes(row["Notes"]), row["Predicted Chord"]) for row in csv.DictReader(f)]
+        if notes_csv and os.path.exists(notes_csv):
+            with open(notes_csv, newline='', encoding='utf-8') as f:
+                notes = [(None, row["Note"]) for row in csv.DictReader(f)]
+        with self.transaction() as conn:
+            self._replace(conn, song, stem, chords, notes)
+        return True
+
+    def migrate(self, output_root):
+        """Imports every per-stem CSV under ``output_root`` not stored yet, once per output root.
+
+        Returns the number of stems imported, or None when the root was migrated before.
+        """
+        key = f"csv_migrated:{os.path.abspath(output_root)}"
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return None
+        imported = 0
+        for folder, _, files in os.walk(output_root):
+            for name in files:
+                suffix = CHORDS_SUFFIX if name.endswith(CHORDS_SUFFIX) else NOTES_SUFFIX if name.endswith(NOTES_SUFFIX) else None
+                if suffix is None:
+                    continue
+                song, stem = stem_from_csv(os.path.join(folder, name), suffix)
+                if self.has_stem(song, stem):
+                    continue
+                imported += self.import_csvs(song, stem, os.path.join(folder, stem + CHORDS_SUFFIX),
+                                             os.path.join(folder, stem + NOTES_SUFFIX))
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(time.time())))
+        print(f"✅ Imported {imported} stem(s) from the CSV files under {output_root}")
+        return imported
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_analysis_store():
+    """Returns the process-wide analysis store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AnalysisStore()
+        return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query and migrate the chord and note analysis store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="import the per-stem CSV files")
+    migrate.add_argument("--output", default=os.path.join("output", "htdemucs_6s"))
+    chords = commands.add_parser("chords", help="print chord frequencies")
+    chords.add_argument("--song")
+    chords.add_argument("--stem")
+    chords.add_argument("--limit", type=int, default=20)
+    note = commands.add_parser("note", help="list the chords holding a MIDI note")
+    note.add_argument("note", type=int)
+    note.add_argument("--song")
+    note.add_argument("--stem")
+    note.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    store = get_analysis_store()
+    if args.command == "migrate":
+        if store.migrate(args.output) is None:
+            print(f"ℹ️ {args.output} was already migrated")
+    elif args.command == "note":
+        for song, stem, time_us, chord in store.chords_with_note(args.note, args.song, args.stem, args.limit):
+            at = "" if time_us is None else f"{time_us / 1e6:.2f}s"
+            print(f"{song}/{stem:<12}{at:>10}  {chord}")
+    else:
+        for chord, count in store.chord_frequency(args.song, args.stem, args.limit):
+            print(f"{chord:<12}{count}")
+
+
+if __name__ == '__main__':
+    main()
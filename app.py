@@ -1,25 +1,36 @@
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory
+from flask import Flask, Response, render_template, request, redirect, url_for, send_file, send_from_directory, jsonify
+import json
 import os
-import subprocess
-import yt_dlp
-import mido
-import joblib
-import pandas as pd
-import whisper
+import threading
+import time
+from separation import stem_dir_for, is_separated
+from analysis_store import CHORDS_SUFFIX, NOTES_SUFFIX, get_analysis_store, stem_from_csv
+from artifacts import get_artifact_index
+from catalog import CATALOG_PAGE_SIZE, get_catalog
+from jobs import JobQueue
+from events import get_event_log, publish, song_channel
+from midi_transcription import PITCHED_STEMS
+from previews import PREVIEW_DIR, get_preview_encoder, has_preview
+from songbook import build_songbooks, get_songbook, page_path
+from warmup import get_preloader, PRELOAD, READY_REQUIRES
+# Models and heavy libraries (pandas, yt_dlp, whisper/torch, demucs, the chord classifier) are
+# imported by the routes and job handlers that use them, so serving the song list never loads them
+
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
 
 app = Flask(__name__)
 
-model = joblib.load("model/chord_classifier.pkl")
-mlb = joblib.load("model/notes_encoder.pkl")
 UPLOAD_FOLDER = 'songs'
 OUTPUT_DIR = 'output'
-MIDI_DIR = "midi"
 MODEL_NAME = "htdemucs_6s"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-TIME_THRESHOLD = 50
-MERGE_THRESHOLD = 1000
+# Behind a proxy that honours X-Sendfile, let it stream the stem files instead of Python
+app.config['USE_X_SENDFILE'] = os.environ.get("TRACKAI_X_SENDFILE", "0") == "1"
 
 AVAILABLE_LANGUAGES = {
     "en": "en-US",
@@ -31,12 +42,6 @@ AVAILABLE_LANGUAGES = {
     "tr": "tr-TR"
 }
 
-def list_songs(directory="songs"):
-    """Lists all files in the songs folder."""
-    if not os.path.exists(directory):
-        return []
-    return [f for f in os.listdir(directory) if f.endswith(".mp3") or f.endswith(".wav")]
-
 def download_audio(song_name, song_author):
     """Downloads an audio file from YouTube based on a search query."""
     output_filename = os.path.join(UPLOAD_FOLDER, f"{song_author} - {song_name}")
@@ -50,40 +55,21 @@ def download_audio(song_name, song_author):
             'preferredquality': '192',
         }],
     }
+    import yt_dlp
+
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         ydl.extract_info(f"ytsearch:{search_query}", download=True)
-    return output_filename
 
-def separate_audio(file_path, model=MODEL_NAME, output_dir=OUTPUT_DIR, device="cpu"):
-    """Runs Demucs to separate audio sources from a given file if it hasn't been separated yet."""
-    output_path = os.path.join(output_dir, model, file_path.replace(".mp3", "").replace(".wav", ""))
-    output_path = output_path.replace(os.path.sep + "songs" + os.path.sep, os.path.sep)
-
-    if os.path.exists(output_path) and os.listdir(output_path):
-        print(f"✅ Audio already separated: {output_path}")
-        return output_path  # Skip processing if the folder already exists with files
-
-    if not os.path.exists(file_path):
-        print(f"❌ Error: File {file_path} not found.")
-        return None
-
-    print(f"🔄 Running Demucs on {file_path} using model {model}...")
-
-    command = [
-        "demucs", "-n", model,
-        "-d", device,
-        "--out", output_dir,
-        file_path
-    ]
-
-    subprocess.run(command, check=True)
-    print(f"✅ Separation complete. Output saved in {output_path}")
-    return output_path
+    # Hash the downloaded audio so a song we already processed reuses its artifacts
+    digest = get_artifact_index().digest(output_filename + ".mp3")
+    if digest:
+        print(f"✅ Downloaded {output_filename}.mp3 (content {digest[:12]})")
+        get_catalog().add(output_filename + ".mp3", folder=song_channel(stem_dir_for(output_filename + ".mp3")))
+    return output_filename
 
 def list_output_files(file_path, model=MODEL_NAME):
     """Lists all output files from Demucs processing."""
-    output_path = os.path.join(OUTPUT_DIR, model, file_path.replace(".mp3", "").replace(".wav", ""))
-    output_path = output_path.replace(os.path.sep + "songs" + os.path.sep, os.path.sep)
+    output_path = stem_dir_for(file_path, model)
     if not os.path.exists(output_path):
         print(f"Error: Output directory {output_path} not found.")
         return []
@@ -96,245 +82,248 @@ def list_output_files(file_path, model=MODEL_NAME):
 
     return files, output_path
 
-def convert_to_midi(wav_file):
-    """Converts a WAV file to MIDI, processes it, reconstructs it, and extracts chords."""
-    if not os.path.exists(wav_file):
-        print(f"❌ Error: File {wav_file} not found.")
-        return None
-
-    midi_output_dir = os.path.join(os.path.dirname(wav_file), MIDI_DIR)
-    midi_file = os.path.join(midi_output_dir, os.path.basename(wav_file).replace(".wav", "_basic_pitch.mid"))
-
-    if os.path.exists(midi_file):
-        print(f"✅ MIDI file already exists: {midi_file}")
+def payload_channel(payload):
+    """Returns the event channel of the song a job payload refers to."""
+    if payload.get("filename"):
+        return song_channel(stem_dir_for(os.path.join(UPLOAD_FOLDER, payload["filename"])))
+    if payload.get("stem_dir"):
+        return song_channel(payload["stem_dir"])
+    return song_channel(os.path.dirname(payload.get("wav_file") or payload["file_path"]))
+
+def record_status(payload, channel, kind, status):
+    """Mirrors a job's state into the song catalog; a catalog error never fails the job."""
+    try:
+        get_catalog().set_status(kind, status, filename=payload.get("filename"), folder=channel)
+    except Exception as e:
+        print(f"⚠️ Could not update the catalog for {channel}: {e}")
+
+def with_song_events(kind, handler):
+    """Wraps a job handler so its start, progress, result and failure are published to the song's channel."""
+    def run(payload, progress):
+        channel = payload_channel(payload)
+
+        def report(fraction, message=None):
+            progress(fraction, message)
+            publish(channel, "progress", job=kind, percent=round(fraction * 100), message=message)
+
+        publish(channel, "job_started", job=kind)
+        record_status(payload, channel, kind, "running")
+        try:
+            result = handler(payload, report)
+        except Exception as e:
+            publish(channel, "job_failed", job=kind, error=str(e))
+            record_status(payload, channel, kind, "failed")
+            raise
+        publish(channel, "job_finished", job=kind, result=result)
+        record_status(payload, channel, kind, "finished")
+        return result
+    return run
+
+def run_separation_job(payload, progress):
+    """Job handler: separates an uploaded song into stems."""
+    from separation import separate_audio
+
+    progress(0.0, "Separating stems")
+    output_path = separate_audio(os.path.join(UPLOAD_FOLDER, payload["filename"]))
+    if not output_path:
+        raise FileNotFoundError(f"File {payload['filename']} not found.")
+    get_preview_encoder().submit(output_path)
+    return {"output_path": output_path}
+
+def run_midi_job(payload, progress):
+    """Job handler: converts one stem, or every pitched stem of a song, to MIDI and extracts chords and notes."""
+    from midi_analysis import convert_to_midi, convert_song_to_midi
+
+    if payload.get("wav_file"):
+        progress(0.0, f"Converting {os.path.basename(payload['wav_file'])} to MIDI")
+        result = convert_to_midi(payload["wav_file"])
     else:
-        os.makedirs(midi_output_dir, exist_ok=True)
-        print(f"🔄 Converting {wav_file} to MIDI...")
-        command = [
-            "basic-pitch",
-            midi_output_dir,  # Output directory
-            wav_file,
-            "--save-midi"
-        ]
-        subprocess.run(command, check=True)
-        midi_files = [f for f in os.listdir(midi_output_dir) if f.endswith(".mid")]
-        if not midi_files:
-            print("❌ Error: No MIDI file was created.")
-            return None
-        midi_file = os.path.join(midi_output_dir, midi_files[0])
-        print(f"✅ MIDI conversion complete. MIDI file saved as {midi_file}")
-
-    processed_midi = process_midi(midi_file)
-    reconstructed_midi = reconstruct_midi(midi_file, processed_midi)
-
-    # Extract chords after reconstructing the MIDI
-    wav_filename = os.path.basename(wav_file).replace(".wav", "")
-    chords_csv_path = detect_chords(reconstructed_midi, wav_filename)
-
-    notes_csv_path = detect_notes(reconstructed_midi, wav_filename)
-
-    if notes_csv_path:
-        print(f"✅ Notes saved in {notes_csv_path}")
-
-    if chords_csv_path:
-        print(f"✅ Chord detection complete. Chords saved in {chords_csv_path}")
-    return {"status": "success", "message": "MIDI conversion complete, chords and notes extracted"}
-
-def process_midi(midi_path):
-    """Processes the MIDI file by grouping notes into chords."""
-    midi_file = mido.MidiFile(midi_path)
-    filtered_midi = mido.MidiFile()
-    filtered_tracks = []
-
-    for track in midi_file.tracks:
-        new_track = mido.MidiTrack()
-        note_ranges = {}
-
-        for msg in track:
-            if msg.type == "note_on" and msg.velocity > 0:
-                if msg.note in note_ranges:
-                    last_note = note_ranges[msg.note]
-                    if msg.time - last_note['end_time'] <= MERGE_THRESHOLD:
-                        last_note['end_time'] = msg.time
-                    else:
-                        note_ranges[msg.note] = {'start_time': msg.time, 'end_time': msg.time}
-                else:
-                    note_ranges[msg.note] = {'start_time': msg.time, 'end_time': msg.time}
-
-            elif msg.type == "note_off" or (msg.type == "note_on" and msg.velocity == 0):
-                if msg.note in note_ranges:
-                    note_ranges[msg.note]['end_time'] = msg.time
-
-        for note, times in note_ranges.items():
-            new_track.append(mido.Message("note_on", note=note, velocity=64, time=times['start_time']))
-            new_track.append(mido.Message("note_off", note=note, velocity=0, time=times['end_time']))
-
-        filtered_tracks.append(new_track)
-
-    filtered_midi.tracks.extend(filtered_tracks)
-    processed_midi_path = midi_path.replace(".mid", "_processed.mid")
-    filtered_midi.save(processed_midi_path)
-
-    print(f"✅ Processed MIDI saved as {processed_midi_path}")
-    return processed_midi_path
-
-def reconstruct_midi(original_midi, processed_midi):
-    """Reorders the processed MIDI according to the original sequence."""
-    original_midi_file = mido.MidiFile(original_midi)
-    processed_midi_file = mido.MidiFile(processed_midi)
-    reconstructed_midi = mido.MidiFile()
-    reconstructed_tracks = []
-
-    original_sequence = [msg.note for track in original_midi_file.tracks for msg in track if
-                         msg.type == "note_on" and msg.velocity > 0]
-    processed_notes = [msg for track in processed_midi_file.tracks for msg in track if
-                       msg.type == "note_on" and msg.velocity > 0]
-
-    new_track = mido.MidiTrack()
-    note_map = {}
-
-    for note in original_sequence:
-        for msg in processed_notes:
-            if msg.note == note and note not in note_map:
-                note_map[note] = msg
-                break
-
-    for note in original_sequence:
-        if note in note_map:
-            msg_on = note_map[note]
-            msg_off = mido.Message("note_off", note=note, velocity=0, time=msg_on.time + 200)
-            new_track.append(msg_on)
-            new_track.append(msg_off)
-
-    reconstructed_tracks.append(new_track)
-    reconstructed_midi.tracks.extend(reconstructed_tracks)
-
-    reconstructed_path = processed_midi.replace("_processed.mid", "_reconstructed.mid")
-    reconstructed_midi.save(reconstructed_path)
-
-    print(f"✅ Reconstructed MIDI saved as {reconstructed_path}")
-    return reconstructed_path
-
-def detect_chords(midi_path, wav_filename):
-    """Detects chords in the MIDI file, avoiding immediate repetitions and filtering out similar chords."""
-    if not os.path.exists(midi_path):
-        print(f"❌ Error: MIDI file {midi_path} not found.")
-        return None
-
-    midi_file = mido.MidiFile(midi_path)
-    chords = []
-    current_chord = []
-    current_time = 0
-
-    for track in midi_file.tracks:
-        for msg in track:
-            if msg.type == "note_on" and msg.velocity > 0:
-                if current_chord and (msg.time - current_time > TIME_THRESHOLD):
-                    chords.append(tuple(sorted(set(current_chord))))
-                    current_chord = []
-                current_chord.append(msg.note)
-                current_time = msg.time
-
-    if current_chord:
-        chords.append(tuple(sorted(set(current_chord))))
-
-    # Predict chords
-    valid_chords = [(chord, model.predict(mlb.transform([chord]))[0] if chord else "Unknown") for chord in chords]
-
-    # Filter immediate repetitions and similar chords
-    filtered_chords = []
-    last_prediction = None
-
-    for chord, prediction in valid_chords:
-        if prediction != last_prediction and not is_similar_to_last(filtered_chords, chord):
-            filtered_chords.append((chord, prediction))
-            last_prediction = prediction
-
-    # Create a DataFrame
-    df = pd.DataFrame(filtered_chords, columns=["Notes", "Predicted Chord"])
-
-    # Save CSV with the correct WAV-based name
-    output_folder = os.path.dirname(midi_path)
-    chords_csv_path = os.path.join(output_folder, f"{wav_filename}_filtered_chords.csv")
-
-    df.to_csv(chords_csv_path, index=False)
-
-    print(f"✅ Filtered chords saved in {chords_csv_path}")
-    return chords_csv_path
-
-def is_similar(chord1, chord2, threshold=3):
-    """Checks if two chords are similar based on overlapping notes."""
-    return len(set(chord1) & set(chord2)) >= threshold
-
-def is_similar_to_last(filtered_chords, current_chord, threshold=3):
-    """Checks if the current chord is similar to any of the last few filtered chords."""
-    for chord, _ in filtered_chords[-3:]:  # Compare with the last 3 filtered chords
-        if is_similar(chord, current_chord, threshold):
-            return True
-    return False
-
-def detect_notes(midi_path, wav_filename):
-    """Extracts notes from the MIDI file and saves them to a CSV."""
-    if not os.path.exists(midi_path):
-        print(f"❌ Error: MIDI file {midi_path} not found.")
-        return None
-
-    midi_file = mido.MidiFile(midi_path)
-    notes = []
-
-    for track in midi_file.tracks:
-        for msg in track:
-            if msg.type == "note_on" and msg.velocity > 0:
-                notes.append(msg.note)
-
-    # Create a DataFrame
-    df = pd.DataFrame(notes, columns=["Note"])
-
-    # Save CSV with the correct WAV-based name
-    output_folder = os.path.dirname(midi_path)
-    notes_csv_path = os.path.join(output_folder, f"{wav_filename}_notes.csv")
-
-    df.to_csv(notes_csv_path, index=False)
-
-    print(f"✅ Notes saved in {notes_csv_path}")
-    return notes_csv_path
+        progress(0.0, "Converting stems to MIDI")
+        result = convert_song_to_midi(payload["stem_dir"], progress=progress)
+    if result is None:
+        raise RuntimeError("MIDI conversion failed.")
+    refresh_songbooks(payload.get("stem_dir") or os.path.dirname(payload["wav_file"]))
+    return result
+
+def run_lyrics_job(payload, progress):
+    """Job handler: transcribes the lyrics of a vocals stem."""
+    from transcription import transcribe_lyrics
+
+    progress(0.0, "Transcribing lyrics")
+    lyrics_file = transcribe_lyrics(payload["file_path"], payload["language"])
+    if not lyrics_file:
+        raise RuntimeError("Lyrics could not be generated.")
+    refresh_songbooks(os.path.dirname(payload["file_path"]))
+    return {"lyrics_file": lyrics_file}
+
+def run_pipeline_job(payload, progress):
+    """Job handler: runs every processing stage of a song as a parallel DAG."""
+    from pipeline import run_song_pipeline
+
+    file_path = os.path.join(UPLOAD_FOLDER, payload["filename"])
+    channel = payload_channel(payload)
+    summary = run_song_pipeline(file_path, payload.get("language", "en"), payload.get("lyrics", True), progress=progress,
+                                events=lambda kind, **data: publish(channel, kind, **data))
+    if summary["errors"]:
+        raise RuntimeError("; ".join(f"{name}: {error}" for name, error in summary["errors"].items()))
+    refresh_songbooks(stem_dir_for(file_path))
+    return {"timings": summary["timings"], "wall_time": summary["wall_time"]}
+
+JOBS_DB_PATH = os.environ.get("TRACKAI_JOBS_DB", "queue/jobs.sqlite")
+JOB_WORKERS = int(os.environ.get("TRACKAI_JOB_WORKERS", 2))
+job_queue = JobQueue(JOBS_DB_PATH, {
+    "separate": with_song_events("separate", run_separation_job),
+    "midi": with_song_events("midi", run_midi_job),
+    "lyrics": with_song_events("lyrics", run_lyrics_job),
+    "pipeline": with_song_events("pipeline", run_pipeline_job),
+}, workers=JOB_WORKERS)
+
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background():
+    """Starts the job workers and model preloading in the process that serves requests, once.
+
+    Nothing runs at import time: pipeline worker processes re-import this module,
+    and under the debug reloader the parent process imports it only to watch
+    files while its child serves.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    job_queue.start()
+    # Load what readiness waits for right away, or /readyz would stay 503 until first use
+    if PRELOAD or READY_REQUIRES:
+        get_preloader().start(tuple(dict.fromkeys(PRELOAD + READY_REQUIRES)))
+
+@app.before_request
+def ensure_background():
+    # WSGI servers import the app without running __main__; start on the first request they serve
+    start_background()
+
+def job_response(job_id):
+    """Answers a request that queued a job: JSON for API clients, a status page for browsers."""
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({"job_id": job_id, "status_url": url_for('job_status', job_id=job_id)}), 202
+    return render_template('job.html', job_id=job_id), 202
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: 200 once the components in TRACKAI_READY_REQUIRES are loaded, at startup or on first use, 503 before.
+
+    ``?preload=1`` starts loading the required components in the background;
+    ``?preload=whisper,separation`` names the components to load instead.
+    """
+    preloader = get_preloader()
+    preload = request.args.get('preload', '')
+    if preload:
+        preloader.start(READY_REQUIRES if preload in ('1', 'true') else preload.split(','))
+    ready = preloader.ready(READY_REQUIRES)
+    return jsonify({"ready": ready, "requires": list(READY_REQUIRES), "components": preloader.status()}), 200 if ready else 503
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Reports a background job's state, progress and result location."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job)
+
+EVENT_POLL_INTERVAL = 0.5  # seconds between checks for new events
+EVENT_KEEPALIVE = 15  # seconds of silence before a keep-alive comment
+EVENT_IDLE_LIMIT = 300  # seconds of silence before the stream ends and the browser reconnects
+TERMINAL_EVENTS = ("job_finished", "job_failed")
+
+@app.route('/events/<path:subdir>', methods=['GET'])
+def song_events(subdir):
+    """Streams a song's progress events (stages, percent, partial results) as Server-Sent Events.
+
+    The stream ends with a ``done`` event right after a job finishes or fails,
+    and without one after EVENT_IDLE_LIMIT seconds of silence, upon which the
+    browser reconnects from the last event id.
+    """
+    after = request.headers.get('Last-Event-ID') or request.args.get('after', '0')
+    after = int(after) if after.isdigit() else 0
+    event_log = get_event_log()
+
+    def stream():
+        last_id, idle, silent = after, 0.0, 0.0
+        yield "retry: 2000\n\n"
+        while silent < EVENT_IDLE_LIMIT:
+            events = event_log.since(subdir, last_id)
+            for event_id, kind, data in events:
+                last_id = event_id
+                yield f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+                if kind in TERMINAL_EVENTS:
+                    yield "event: done\ndata: {}\n\n"
+                    return
+            if events:
+                idle = silent = 0.0
+                continue
+            time.sleep(EVENT_POLL_INTERVAL)
+            idle += EVENT_POLL_INTERVAL
+            silent += EVENT_POLL_INTERVAL
+            if idle >= EVENT_KEEPALIVE:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def render_songbook(formatted_lyrics):
+    """Renders songbook lines to HTML; usable from job threads as well as requests."""
+    with app.app_context():
+        return render_template('lyrics_with_chords.html', formatted_lyrics=formatted_lyrics)
+
+def refresh_songbooks(stem_dir):
+    """Builds the song's songbooks once both its lyrics and chords exist."""
+    return build_songbooks(stem_dir, render_songbook)
 
 @app.route('/generate_songbook', methods=['POST'])
 def generate_songbook():
-    filename = request.form.get('filename')
+    """Kept for old forms: the songbook is now a cacheable GET."""
     subdir = request.form.get('subdir')
     instrument = request.form.get('instrument', 'guitar')  # Default to guitar
+    return redirect(url_for('show_songbook', subdir=subdir, instrument=instrument), 303)
 
-    lyrics_file = os.path.join(OUTPUT_DIR, MODEL_NAME, subdir, "vocals_lyrics.txt")
-    chords_file = os.path.join(OUTPUT_DIR, MODEL_NAME, subdir, 'midi', f"{instrument}_filtered_chords.csv")
-
-    if not os.path.exists(lyrics_file) or not os.path.exists(chords_file):
+def song_dir(subdir):
+    """Resolves a song folder named in a URL, or returns None unless it is an existing folder of the output tree."""
+    root = os.path.realpath(os.path.join(OUTPUT_DIR, MODEL_NAME))
+    stem_dir = os.path.realpath(os.path.join(root, subdir))
+    if os.path.dirname(stem_dir) != root or not os.path.isdir(stem_dir):
+        return None
+    return stem_dir
+
+@app.route('/songbook/<path:subdir>', methods=['GET'])
+def show_songbook(subdir):
+    """Serves the prebuilt songbook of ?instrument= with ETag, Last-Modified and pre-compressed bodies."""
+    instrument = request.args.get('instrument', 'guitar')  # Default to guitar
+    if instrument not in PITCHED_STEMS:
+        return "Unknown instrument.", 404
+
+    # Building writes into the folder, so only an existing song folder may be named
+    stem_dir = song_dir(subdir)
+    if stem_dir is None:
+        return "Song not found.", 404
+    manifest = get_songbook(stem_dir, instrument, render_songbook)
+    if manifest is None:
         return "Lyrics or Chords file not found.", 404
 
-    # Read lyrics
-    with open(lyrics_file, 'r', encoding='utf-8') as f:
-        lyrics = [line.strip() for line in f.readlines()]
-
-    # Read chords
-    chords_df = pd.read_csv(chords_file)
-    chord_list = chords_df["Predicted Chord"].tolist()
-
-    all_words = " ".join(lyrics).split()
-
-    # Ensure chord count does not exceed word count
-    chord_positions = [" " * len(word) for word in all_words]
-
-    for i in range(min(len(chord_list), len(all_words))):
-        chord_positions[i] = chord_list[i].ljust(len(all_words[i]))  # Align chord to word length
-
-    # Create alternating lines
-    formatted_lyrics = []
-    for i in range(0, len(all_words), 8):  # Group every 8 words to fit within a row
-        chord_line = " ".join(chord_positions[i:i + 8])
-        lyric_line = " ".join(all_words[i:i + 8])
-        formatted_lyrics.append((chord_line, lyric_line))
-
-    return render_template('lyrics_with_chords.html', formatted_lyrics=formatted_lyrics)
+    encoding = next((name for name in manifest["encodings"] if request.accept_encodings[name]), None)
+    etag = f"{manifest['etag']}-{encoding}" if encoding else manifest["etag"]
+    response = send_file(page_path(stem_dir, instrument, encoding), mimetype='text/html', etag=etag,
+                         last_modified=manifest["built"], max_age=0, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/generate_lyrics', methods=['POST'])
 def generate_lyrics():
@@ -348,17 +337,9 @@ def generate_lyrics():
     if not os.path.exists(file_path):
         return f"File {file_path} not found. Please process the file again.", 404
 
-    model = whisper.load_model("base")
-    result = model.transcribe(file_path, language=language)
-
-    lyrics = result["text"]
-    if lyrics:
-        lyrics_file = os.path.join(OUTPUT_DIR, MODEL_NAME, subdir, f"{filename.replace('.wav', '')}_lyrics.txt")
-        with open(lyrics_file, 'w', encoding='utf-8') as f:
-            f.write(lyrics)
-        return "", 204
-    else:
-        return "Lyrics could not be generated.", 500
+    lyrics_url = url_for('show_lyrics', filename=f"{subdir}/{filename.replace('.wav', '')}_lyrics.txt")
+    job_id = job_queue.enqueue("lyrics", {"file_path": file_path, "language": language}, result_url=lyrics_url)
+    return job_response(job_id)
 
 @app.route('/lyrics/<path:filename>', methods=['GET'])
 def show_lyrics(filename):
@@ -376,33 +357,33 @@ def show_lyrics(filename):
 
 @app.route('/notes/<path:filename>', methods=['GET'])
 def show_notes(filename):
-    notes_csv_path = os.path.normpath(os.path.join(OUTPUT_DIR, MODEL_NAME, filename))
-    print(f"Looking for notes file at: {notes_csv_path}")
-
-    if not os.path.exists(notes_csv_path):
+    """Shows a stem's notes, addressed by its notes CSV path, from the analysis store."""
+    song, stem = stem_from_csv(filename, NOTES_SUFFIX)
+    if not stored_analysis(song, stem):
         return "Notes file not found.", 404
 
-    df = pd.read_csv(notes_csv_path)
-    notes = df["Note"].tolist()
-
+    notes = [note for note, _ in get_analysis_store().notes(song, stem)]
     return render_template('notes.html', notes=notes)
 
 @app.route('/')
 def index():
-    search_query = request.args.get('search', '').strip().lower()
-    songs = list_songs(app.config['UPLOAD_FOLDER'])
-
-    if search_query:
-        songs = [song for song in songs if search_query in song.lower()]
+    search_query = request.args.get('search', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    catalog = get_catalog()
+    catalog.ensure_synced(app.config['UPLOAD_FOLDER'])
+    songs, total = catalog.search(search_query, page, CATALOG_PAGE_SIZE)
+    pages = max((total + CATALOG_PAGE_SIZE - 1) // CATALOG_PAGE_SIZE, 1)
 
-    return render_template('index.html', songs=songs)
+    return render_template('index.html', songs=songs, search=search_query, page=page, pages=pages, total=total)
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
     file = request.files['file']
     if file:
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(file_path)
+        # Hash while the upload streams to disk; the digest keys the song's artifacts
+        get_artifact_index().save_stream(file.stream, file_path)
+        get_catalog().add(file_path, folder=song_channel(stem_dir_for(file_path)))
     return redirect(url_for('index'))
 
 @app.route('/download', methods=['POST'])
@@ -417,39 +398,102 @@ def download():
 def process(filename):
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     if os.path.exists(file_path):
-        output_path = separate_audio(file_path)
-        if output_path:
-            files, _ = list_output_files(filename)
-            # Check if lyrics exist for vocals.wav
-            lyrics_exist = os.path.exists(os.path.join(output_path, "vocals_lyrics.txt"))
-            return render_template('output.html', files=files, output_path=output_path, subdir=os.path.basename(output_path), lyrics_exist=lyrics_exist)
+        if not is_separated(file_path):
+            job_id = job_queue.enqueue("separate", {"filename": filename}, result_url=url_for('process', filename=filename))
+            return job_response(job_id)
+        output_path = stem_dir_for(file_path)
+        files, _ = list_output_files(file_path)
+        # Check if lyrics exist for vocals.wav
+        lyrics_exist = os.path.exists(os.path.join(output_path, "vocals_lyrics.txt"))
+        subdir = os.path.basename(output_path)
+        # Play the compact previews; stems separated before previews existed get theirs in the background
+        previews = {file: has_preview(os.path.join(output_path, file)) for file in files}
+        if not all(previews.values()):
+            get_preview_encoder().submit(output_path)
+        return render_template('output.html', files=files, output_path=output_path, subdir=subdir, lyrics_exist=lyrics_exist,
+                               previews=previews, preview_dir=PREVIEW_DIR,
+                               last_event_id=get_event_log().last_id(song_channel(output_path)))
     return redirect(url_for('index'))
 
+@app.route('/pipeline/<filename>', methods=['GET'])
+def run_pipeline(filename):
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(file_path):
+        return redirect(url_for('index'))
+    language = request.args.get('language', 'en').split('-')[0]
+    job_id = job_queue.enqueue("pipeline", {"filename": filename, "language": language}, result_url=url_for('process', filename=filename))
+    return job_response(job_id)
+
+@app.route('/convert_to_midi', methods=['GET'])
 @app.route('/convert_to_midi/<filename>', methods=['GET'])
-def convert(filename):
+def convert(filename=None):
     subdir = request.args.get('subdir', '').strip()
+    if filename is None:
+        # No stem given: transcribe every pitched stem of the song in one batch
+        job_id = job_queue.enqueue("midi", {"stem_dir": os.path.join(OUTPUT_DIR, MODEL_NAME, subdir)})
+        return job_response(job_id)
+
     if subdir:
         wav_file_path = os.path.join(OUTPUT_DIR, MODEL_NAME, subdir, filename)
     else:
         wav_file_path = os.path.join(OUTPUT_DIR, MODEL_NAME, filename)
 
-    convert_to_midi(wav_file_path)
+    chords_csv = os.path.join(subdir, 'midi', filename.replace('.wav', '_filtered_chords.csv')) if subdir else filename.replace('.wav', '_filtered_chords.csv')
+    job_id = job_queue.enqueue("midi", {"wav_file": wav_file_path}, result_url=url_for('show_chords', filename=chords_csv))
+    return job_response(job_id)
 
-    # Return a 204 No Content response to indicate success without content.
-    return '', 204
+def stored_analysis(song, stem):
+    """Checks a stem is in the analysis store, importing it from its CSV files if it was analyzed before the store."""
+    store = get_analysis_store()
+    if store.has_stem(song, stem):
+        return True
+    midi_dir = os.path.join(OUTPUT_DIR, MODEL_NAME, song, 'midi')
+    return store.import_csvs(song, stem, os.path.join(midi_dir, stem + CHORDS_SUFFIX), os.path.join(midi_dir, stem + NOTES_SUFFIX))
 
 @app.route('/chords/<path:filename>', methods=['GET'])
 def show_chords(filename):
-    chords_csv_path = os.path.normpath(os.path.join(OUTPUT_DIR, MODEL_NAME, filename))
-    print(f"Looking for chords file at: {chords_csv_path}")
-
-    if not os.path.exists(chords_csv_path):
+    """Shows a stem's chords, addressed by its chords CSV path, from the analysis store."""
+    song, stem = stem_from_csv(filename, CHORDS_SUFFIX)
+    if not stored_analysis(song, stem):
         return "Chord file not found.", 404
 
-    df = pd.read_csv(chords_csv_path)
-    chords = df.values.tolist()
-
-    return render_template('chords.html', chords=chords)
+    return render_template('chords.html', chords=get_analysis_store().chords(song, stem))
+
+@app.route('/chord_cache/stats', methods=['GET'])
+def chord_cache_stats():
+    """Reports hit/miss counters of the shared chord-prediction cache."""
+    from classifier import get_classifier
+
+    return jsonify(get_classifier().cache.stats())
+
+if Sock is not None:
+    sock = Sock(app)
+
+    @sock.route('/live')
+    def live_chords(ws):
+        """Live chord recognition: binary 16-bit mono PCM frames in, one JSON chord label per frame out."""
+        from realtime import LIVE_SAMPLE_RATE, LiveChordRecognizer
+
+        rate = request.args.get('rate', str(LIVE_SAMPLE_RATE))
+        try:
+            recognizer = LiveChordRecognizer(sample_rate=int(rate))
+        except ValueError as e:
+            error = str(e) if rate.lstrip('-').isdigit() else f"Invalid sample rate '{rate}'"
+            ws.send(json.dumps({"error": error}))
+            ws.close(1008, error)  # policy violation: the stream's parameters are not acceptable
+            return
+        while True:
+            data = ws.receive()
+            if data is None:
+                break
+            if isinstance(data, str):
+                if data == "reset":
+                    recognizer.reset()
+                continue
+            for result in recognizer.feed_pcm16(data[:len(data) - len(data) % 2]):
+                ws.send(json.dumps(result))
+else:
+    print("⚠️ flask-sock is not installed, the /live WebSocket endpoint is disabled.")
 
 @app.route('/songs/<filename>')
 def serve_song(filename):
@@ -457,8 +501,12 @@ def serve_song(filename):
 
 @app.route('/output/<path:filename>')
 def serve_output_file(filename):
-    """Serves audio files from the output directory."""
+    """Serves stems and previews from the output directory."""
     return send_from_directory(OUTPUT_DIR + '/' + MODEL_NAME, filename)
 
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    debug = True
+    # The reloader's parent process only restarts its child (WERKZEUG_RUN_MAIN=true), which serves
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background()
+    app.run(host="0.0.0.0", port=5000, debug=debug)
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import threading
+
+from sqlite_store import SQLiteStore
+
+ARTIFACT_INDEX_PATH = os.environ.get("TRACKAI_ARTIFACT_INDEX", "cache/artifacts.sqlite")
+CHUNK_SIZE = 1 << 20
+
+
+class ArtifactIndex(SQLiteStore):
+    """Maps song files to the content hash that keys their derived artifacts.
+
+    Stems, MIDI, chord and note CSVs and lyrics of a song live in a folder named
+    after the SHA-256 of its audio, so the same recording uploaded under another
+    name, or downloaded again, reuses everything already computed for it. Hashes
+    are remembered per (path, size, mtime) so a file is only hashed once.
+    """
+
+    def __init__(self, path=ARTIFACT_INDEX_PATH):
+        super().__init__(path)
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    digest TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS files_digest ON files (digest)")
+
+    def _record(self, file_path, digest):
+        stat = os.stat(file_path)
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (os.path.normpath(file_path), stat.st_size, stat.st_mtime_ns, digest)
+            )
+
+    def save_stream(self, stream, file_path):
+        """Writes an incoming upload stream to disk, hashing it on the way, and returns the digest."""
+        digest = hashlib.sha256()
+        with open(file_path, 'wb') as f:
+            for block in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(block)
+                f.write(block)
+        self._record(file_path, digest.hexdigest())
+        return digest.hexdigest()
+
+    def digest(self, file_path):
+        """Returns the content hash of a file, or None when the file does not exist."""
+        if not os.path.isfile(file_path):
+            return None
+        stat = os.stat(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (os.path.normpath(file_path), stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row:
+            return row[0]
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(block)
+        self._record(file_path, digest.hexdigest())
+        return digest.hexdigest()
+
+    def files_for(self, digest):
+        """Lists the song files known to share the given content hash."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM files WHERE digest = ?", (digest,))]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_artifact_index():
+    """Returns the process-wide artifact index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ArtifactIndex()
+        return _index
@@ -0,0 +1,88 @@
+"""Measures how the chord service coalesces concurrent requests into micro-batches.
+
+Several client threads each classify a stream of small chord requests, once
+in-process and once through a chord service on a temporary socket. The script
+reports throughput, the number of model calls and checks the labels match.
+
+    python bench/chord_service.py [--clients 16] [--requests 50] [--chords 40] [--batch-size 512] [--max-wait-ms 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chord_service import ChordService, ChordServiceClient  # noqa: E402
+from classifier import ChordClassifier  # noqa: E402
+
+
+class CountingClassifier:
+    """Wraps a classifier and counts its predict calls."""
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.calls = 0
+
+    def predict(self, chords):
+        self.calls += 1
+        return self.classifier.predict(chords)
+
+
+def run_clients(predict, workload):
+    results = [None] * len(workload)
+
+    def client(i):
+        results[i] = [list(map(str, predict(i, chords))) for chords in workload[i]]
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(len(workload))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--chords", type=int, default=40, help="chords per request")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    workload = [[[tuple(sorted(rng.choice(np.arange(31, 79), rng.integers(2, 6), replace=False).tolist()))
+                  for _ in range(args.chords)] for _ in range(args.requests)] for _ in range(args.clients)]
+    total = args.clients * args.requests * args.chords
+
+    # No prediction cache, so both runs pay for every model call
+    classifier = CountingClassifier(ChordClassifier(cache_path=None))
+    expected, local_seconds = run_clients(lambda i, chords: classifier.predict(chords), workload)
+    local_calls, classifier.calls = classifier.calls, 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        service = ChordService(os.path.join(workdir, "chords.sock"), args.batch_size, args.max_wait_ms,
+                               classifier=classifier).start()
+        clients = [ChordServiceClient(service.path) for _ in range(args.clients)]
+        served, service_seconds = run_clients(lambda i, chords: clients[i].predict(chords), workload)
+        service.shutdown()
+
+    print(f"{args.clients} clients x {args.requests} requests x {args.chords} chords = {total} chords")
+    print(f"in-process: {total / local_seconds:,.0f} chords/s in {local_calls} model calls")
+    print(f"service:    {total / service_seconds:,.0f} chords/s in {classifier.calls} model calls "
+          f"(batches of up to {args.batch_size}, {args.max_wait_ms:g} ms wait)")
+    if served != expected:
+        print("❌ Service labels differ from in-process prediction")
+        sys.exit(1)
+    print("✅ Service labels match in-process prediction")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Checks that live chord recognition stays within its latency budget on a single CPU core.
+
+A synthetic chord progression is fed to LiveChordRecognizer one frame at a time,
+as a live stream would deliver it. The latency of a label is the frame length
+(the wait for the frame to complete) plus the time spent analyzing it; the
+script exits non-zero when the 99th percentile exceeds the budget.
+
+    python bench/live_latency.py [--seconds 60] [--frame-ms 100] [--latency-ms 200]
+"""
+import argparse
+import os
+import sys
+
+# Pin to one core before NumPy starts its thread pools
+for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ[variable] = "1"
+if hasattr(os, "sched_setaffinity"):
+    os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+import numpy as np  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from realtime import LIVE_FRAME_MS, LIVE_LATENCY_BUDGET_MS, LIVE_SAMPLE_RATE, LiveChordRecognizer  # noqa: E402
+
+PROGRESSION = [(48, 52, 55), (45, 48, 52), (41, 45, 48), (43, 47, 50, 53)]  # C, Am, F, G7
+CHORD_SECONDS = 2.0
+
+
+def synthesize(seconds, sample_rate):
+    """Renders the progression as harmonic tones with a little noise."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sample_rate * CHORD_SECONDS)) / sample_rate
+    envelope = np.exp(-t * 0.8)
+    blocks, expected = [], []
+    for i in range(int(seconds / CHORD_SECONDS)):
+        notes = PROGRESSION[i % len(PROGRESSION)]
+        block = sum(amplitude * np.sin(2 * np.pi * 440 * 2 ** ((note - 69) / 12) * harmonic * t)
+                    for note in notes for harmonic, amplitude in ((1, 1.0), (2, 0.5), (3, 0.25)))
+        blocks.append(0.3 * envelope * block / len(notes) + 0.002 * rng.standard_normal(len(t)))
+        expected.append(notes)
+    return np.concatenate(blocks).astype(np.float32), expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--rate", type=int, default=LIVE_SAMPLE_RATE)
+    parser.add_argument("--frame-ms", type=float, default=LIVE_FRAME_MS)
+    parser.add_argument("--latency-ms", type=float, default=LIVE_LATENCY_BUDGET_MS)
+    args = parser.parse_args()
+
+    recognizer = LiveChordRecognizer(sample_rate=args.rate, frame_ms=args.frame_ms, latency_budget_ms=args.latency_ms)
+    audio, expected = synthesize(args.seconds, args.rate)
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes()
+
+    analysis_ms, hits, judged = [], 0, 0
+    frame_bytes = recognizer.hop * 2
+    for start in range(0, len(pcm), frame_bytes):
+        for result in recognizer.feed_pcm16(pcm[start:start + frame_bytes]):
+            analysis_ms.append(result["latency_ms"])
+            # Judge notes once the window lies inside one chord
+            position = result["time"] % CHORD_SECONDS
+            if position > 0.5:
+                judged += 1
+                hits += tuple(result["notes"]) == expected[int(result["time"] // CHORD_SECONDS)]
+
+    analysis_ms = np.array(analysis_ms)
+    end_to_end = args.frame_ms + analysis_ms
+    p50, p95, p99 = np.percentile(end_to_end, [50, 95, 99])
+    print(f"Frames: {len(analysis_ms)} of {args.frame_ms:.0f} ms at {args.rate} Hz on 1 core")
+    print(f"Analysis per frame: mean {analysis_ms.mean():.2f} ms, max {analysis_ms.max():.2f} ms")
+    print(f"Label latency: p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms (budget {args.latency_ms:.0f} ms)")
+    print(f"Notes detected exactly in {hits}/{judged} steady-state frames")
+
+    if p99 > args.latency_ms:
+        print("❌ Latency budget exceeded")
+        sys.exit(1)
+    print("✅ Within latency budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Compares the NumPy MLP engine against the scikit-learn chord model.
+
+Reports cold load time (each in a fresh interpreter), single-chord and batch
+prediction latency, and checks that both return the same label for every chord
+of a random sample. Run ``python mlp_engine.py export`` first.
+
+    python bench/mlp_latency.py [--chords 20000] [--repeats 2000]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+
+from classifier import CHORD_MODEL_PATH, NOTES_ENCODER_PATH  # noqa: E402
+from mlp_engine import MLP_BUNDLE_PATH, MLPEngine  # noqa: E402
+
+LOAD_PROBES = {
+    "scikit-learn": f"import joblib; joblib.load({CHORD_MODEL_PATH!r}); joblib.load({NOTES_ENCODER_PATH!r})",
+    "engine": f"from mlp_engine import MLPEngine; MLPEngine({MLP_BUNDLE_PATH!r})",
+}
+
+
+def cold_load_ms(code, runs=3):
+    """Median wall time of a fresh interpreter running ``code``, minus the bare interpreter start."""
+    def run(source):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", source], cwd=REPO_DIR, check=True)
+        return (time.perf_counter() - started) * 1000
+    baseline = statistics.median(run("pass") for _ in range(runs))
+    return statistics.median(run(code) for _ in range(runs)) - baseline
+
+
+def per_call_us(predict, features, repeats):
+    predict(features)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        predict(features)
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chords", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    import joblib
+    import warnings
+    warnings.simplefilter("ignore")
+
+    model = joblib.load(os.path.join(REPO_DIR, CHORD_MODEL_PATH))
+    engine = MLPEngine(os.path.join(REPO_DIR, MLP_BUNDLE_PATH))
+
+    # Random chords of two to six notes over the encoder's note range
+    rng = np.random.default_rng(0)
+    features = np.zeros((args.chords, len(engine.note_classes)), dtype=np.int64)
+    for row, size in enumerate(rng.integers(2, 7, args.chords)):
+        features[row, rng.choice(features.shape[1], size, replace=False)] = 1
+
+    agree = (model.predict(features) == engine.predict(features)).mean()
+    print(f"Label agreement on {args.chords} chords: {agree:.2%}")
+
+    for name, code in LOAD_PROBES.items():
+        print(f"Cold load, {name}: {cold_load_ms(code):.0f} ms")
+
+    single = {name: per_call_us(predict, features[:1], args.repeats)
+              for name, predict in (("scikit-learn", model.predict), ("engine", engine.predict))}
+    batch = {name: per_call_us(predict, features, 5) / args.chords
+             for name, predict in (("scikit-learn", model.predict), ("engine", engine.predict))}
+    for name in single:
+        print(f"{name:>12}: single chord {single[name]:.0f} µs, batched {batch[name]:.2f} µs/chord")
+    print(f"Single-chord speed-up: {single['scikit-learn'] / single['engine']:.1f}x")
+
+    if agree < 1:
+        print("❌ Engine labels differ from the scikit-learn model")
+        sys.exit(1)
+    print("✅ Engine matches the scikit-learn model")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Measures cold-start time of the web app on the song-list path and checks it against a budget.
+
+Each run starts a fresh interpreter, imports app.py and serves GET / through the
+test client. The script fails when the median exceeds the budget or when any
+heavy module was loaded along the way.
+
+    python bench/startup.py [--runs 5] [--budget-ms 500]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Modules the song list must not pull in; they belong to the routes and jobs that need them
+HEAVY_MODULES = ("pandas", "yt_dlp", "torch", "whisper", "demucs", "basic_pitch", "sklearn", "joblib", "numpy")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get("/")
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+    "status": response.status_code,
+    "heavy": [name for name in HEAVY_MODULES if name in sys.modules],
+}))
+"""
+
+
+def measure(workdir):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, TRACKAI_PRELOAD="", TRACKAI_READY_REQUIRES="",
+               TRACKAI_JOBS_DB=os.path.join(workdir, "jobs.sqlite"),
+               TRACKAI_EVENTS_DB=os.path.join(workdir, "events.sqlite"),
+               TRACKAI_ARTIFACT_INDEX=os.path.join(workdir, "artifacts.sqlite"),
+               TRACKAI_CATALOG_DB=os.path.join(workdir, "catalog.sqlite"))
+    code = f"HEAVY_MODULES = {HEAVY_MODULES!r}\n{PROBE}"
+    output = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("TRACKAI_STARTUP_BUDGET_MS", 500)))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        measure(workdir)  # warm the OS file cache and bytecode
+        runs = [measure(workdir) for _ in range(args.runs)]
+
+    total = [run["import_ms"] + run["first_request_ms"] for run in runs]
+    median = statistics.median(total)
+    print(f"import app: median {statistics.median(run['import_ms'] for run in runs):.0f} ms")
+    print(f"first GET /: median {statistics.median(run['first_request_ms'] for run in runs):.0f} ms")
+    print(f"cold start to first response: median {median:.0f} ms, max {max(total):.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    heavy = sorted({name for run in runs for name in run["heavy"]})
+    failed = False
+    if heavy:
+        print(f"❌ Heavy modules loaded on the song-list path: {', '.join(heavy)}")
+        failed = True
+    if any(run["status"] != 200 for run in runs):
+        print("❌ GET / did not return 200")
+        failed = True
+    if median > args.budget_ms:
+        print("❌ Startup budget exceeded")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ Within startup budget")
+
+
+if __name__ == '__main__':
+    main()
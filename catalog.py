@@ -0,0 +1,186 @@
+import os
+import re
+import threading
+import time
+
+from sqlite_store import SQLiteStore
+
+CATALOG_DB_PATH = os.environ.get("TRACKAI_CATALOG_DB", "cache/catalog.sqlite")
+CATALOG_PAGE_SIZE = int(os.environ.get("TRACKAI_CATALOG_PAGE_SIZE", 50))
+AUDIO_EXTENSIONS = (".mp3", ".wav")
+COLUMNS = ("filename", "title", "artist", "size", "folder", "job", "status", "added_at", "updated_at")
+
+
+def parse_song_name(filename):
+    """Splits a song file name into (title, artist); downloads are named "<artist> - <title>.mp3"."""
+    name = os.path.splitext(filename)[0]
+    if " - " in name:
+        artist, title = name.split(" - ", 1)
+        return title.strip(), artist.strip()
+    return name.strip(), ""
+
+
+def match_query(search):
+    """Turns free text into an FTS5 query matching every word as a prefix, e.g. "beat yel" -> "beat"* "yel"*."""
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in re.findall(r"\w+", search))
+
+
+class SongCatalog(SQLiteStore):
+    """Persistent index of the song library with full-text search over titles, artists and file names.
+
+    Songs are added and removed as they are uploaded, downloaded or deleted,
+    and their processing status follows the job events, so listing a page of the
+    library is an indexed query instead of a directory scan. ``sync`` reconciles
+    the catalog with the songs folder once per process, for files copied in by
+    hand. Search matches word prefixes through an FTS5 table kept in step with
+    ``songs`` by triggers.
+    """
+
+    def __init__(self, path=CATALOG_DB_PATH):
+        super().__init__(path)
+        self._synced = set()
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS songs (
+                    id INTEGER PRIMARY KEY,
+                    filename TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    artist TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    folder TEXT,
+                    job TEXT,
+                    status TEXT,
+                    added_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS songs_name ON songs (filename COLLATE NOCASE)")
+            conn.execute("CREATE INDEX IF NOT EXISTS songs_folder ON songs (folder)")
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS songs_fts USING fts5(
+                    title, artist, filename, content='songs', content_rowid='id',
+                    prefix='1 2 3', tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS songs_fts_insert AFTER INSERT ON songs BEGIN
+                    INSERT INTO songs_fts (rowid, title, artist, filename) VALUES (new.id, new.title, new.artist, new.filename);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS songs_fts_delete AFTER DELETE ON songs BEGIN
+                    INSERT INTO songs_fts (songs_fts, rowid, title, artist, filename)
+                    VALUES ('delete', old.id, old.title, old.artist, old.filename);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS songs_fts_update AFTER UPDATE OF title, artist, filename ON songs BEGIN
+                    INSERT INTO songs_fts (songs_fts, rowid, title, artist, filename)
+                    VALUES ('delete', old.id, old.title, old.artist, old.filename);
+                    INSERT INTO songs_fts (rowid, title, artist, filename) VALUES (new.id, new.title, new.artist, new.filename);
+                END
+            """)
+
+    def add(self, file_path, folder=None):
+        """Adds or refreshes the song stored at ``file_path``; ``folder`` is its stem folder when known."""
+        with self.transaction() as conn:
+            self._upsert(conn, os.path.basename(file_path), os.stat(file_path), folder)
+
+    @staticmethod
+    def _upsert(conn, filename, stat, folder=None):
+        title, artist = parse_song_name(filename)
+        now = time.time()
+        conn.execute("""
+            INSERT INTO songs (filename, title, artist, size, mtime_ns, folder, added_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (filename) DO UPDATE SET
+                size = excluded.size, mtime_ns = excluded.mtime_ns,
+                folder = COALESCE(excluded.folder, folder), updated_at = excluded.updated_at
+        """, (filename, title, artist, stat.st_size, stat.st_mtime_ns, folder, now, now))
+
+    def remove(self, filename):
+        """Drops a song from the catalog."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM songs WHERE filename = ?", (filename,))
+
+    def set_status(self, job, status, filename=None, folder=None):
+        """Records the latest job and its state for a song, found by file name (noting its stem folder) or by folder."""
+        with self.transaction() as conn:
+            if filename:
+                conn.execute("""
+                    UPDATE songs SET job = ?, status = ?, updated_at = ?, folder = COALESCE(?, folder)
+                    WHERE filename = ?
+                """, (job, status, time.time(), folder, filename))
+            else:
+                conn.execute("UPDATE songs SET job = ?, status = ?, updated_at = ? WHERE folder = ?",
+                             (job, status, time.time(), folder))
+
+    def get(self, filename):
+        """Returns a song's catalog entry as a dict, or None."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM songs WHERE filename = ?",
+                                     (filename,)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def search(self, search="", page=1, per_page=CATALOG_PAGE_SIZE):
+        """Returns one page of songs, best matches first when searching, and the total number of matches."""
+        offset = (max(page, 1) - 1) * per_page
+        query = match_query(search)
+        columns = ", ".join(f"songs.{column}" for column in COLUMNS)
+        with self._lock:
+            if query:
+                total = self._conn.execute("SELECT COUNT(*) FROM songs_fts WHERE songs_fts MATCH ?",
+                                           (query,)).fetchone()[0]
+                rows = self._conn.execute(f"""
+                    SELECT {columns} FROM songs_fts JOIN songs ON songs.id = songs_fts.rowid
+                    WHERE songs_fts MATCH ? ORDER BY songs_fts.rank LIMIT ? OFFSET ?
+                """, (query, per_page, offset)).fetchall()
+            else:
+                total = self._conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+                rows = self._conn.execute(f"""
+                    SELECT {columns} FROM songs ORDER BY filename COLLATE NOCASE LIMIT ? OFFSET ?
+                """, (per_page, offset)).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows], total
+
+    def sync(self, directory):
+        """Reconciles the catalog with the audio files of ``directory``; returns (added or changed, removed)."""
+        with self._lock:
+            known = {filename: (size, mtime_ns) for filename, size, mtime_ns in
+                     self._conn.execute("SELECT filename, size, mtime_ns FROM songs")}
+        on_disk = {}
+        if os.path.isdir(directory):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith(AUDIO_EXTENSIONS):
+                        on_disk[entry.name] = entry.stat()
+
+        changed = [filename for filename, stat in on_disk.items()
+                   if known.get(filename) != (stat.st_size, stat.st_mtime_ns)]
+        removed = [filename for filename in known if filename not in on_disk]
+        if changed or removed:
+            with self.transaction() as conn:
+                for filename in changed:
+                    self._upsert(conn, filename, on_disk[filename])
+                conn.executemany("DELETE FROM songs WHERE filename = ?", [(filename,) for filename in removed])
+            print(f"📚 Catalog synced with {directory}: {len(changed)} added or changed, {len(removed)} removed")
+        return len(changed), len(removed)
+
+    def ensure_synced(self, directory):
+        """Runs ``sync`` for a directory the first time this process lists it."""
+        if directory not in self._synced:
+            self.sync(directory)
+            self._synced.add(directory)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Returns the process-wide song catalog."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = SongCatalog()
+        return _catalog
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import time
+
+from sqlite_store import SQLiteStore
+
+CHUNK_SIZE = 1 << 20
+SQLITE_MAX_VARIABLES = 900
+# Bumped whenever the key format changes, so caches written with older keys are emptied
+KEY_FORMAT = "note-mask-v1"
+
+
+def file_fingerprint(*paths):
+    """Returns a SHA-256 digest over the contents of the given files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def chord_key(mask):
+    """Serializes a 128-bit note mask into the cache key, a fixed-width hex string."""
+    return f"{mask:032x}"
+
+
+class ChordCache(SQLiteStore):
+    """Bounded, on-disk LRU cache of chord predictions keyed by note mask (see ``chord_masks``).
+
+    The store is a small SQLite database, so it survives restarts and is shared by
+    every worker process that opens the same path. Every entry is stored with a
+    fingerprint of the model files that predicted it and only entries of this
+    cache's fingerprint are read, so a process still running an older model never
+    sees or serves another model's predictions; entries of other fingerprints are
+    dropped when a cache is opened. Lookups are plain reads: the recency of the
+    entries they hit and the hit and miss counters are written along with the
+    next ``put_many``, or by ``stats()`` and ``close()``, so ``stats()`` reports
+    totals across all workers.
+    """
+
+    def __init__(self, path, model_paths, max_entries=50000):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.fingerprint = f"{KEY_FORMAT}:{file_fingerprint(*model_paths)}"
+        self._touched = {}
+        self._hits = self._misses = 0
+
+        with self.transaction() as conn:
+            # Caches written before each entry carried its model's fingerprint
+            conn.execute("DROP TABLE IF EXISTS predictions")
+            conn.execute("DROP TABLE IF EXISTS meta")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chord_predictions (
+                    model TEXT NOT NULL,
+                    notes TEXT NOT NULL,
+                    chord TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, notes)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS chord_predictions_last_used ON chord_predictions (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0)")
+
+            stale = conn.execute("DELETE FROM chord_predictions WHERE model != ?", (self.fingerprint,)).rowcount
+            if stale:
+                print(f"🔄 Chord model changed, clearing prediction cache {path}")
+                conn.execute("UPDATE stats SET value = 0")
+
+    def get_many(self, masks):
+        """Returns a {mask: prediction} dict for the note masks already in the cache."""
+        keys = {chord_key(mask): mask for mask in masks}
+        found = {}
+        key_list = list(keys)
+        with self._lock:
+            for start in range(0, len(key_list), SQLITE_MAX_VARIABLES):
+                batch = key_list[start:start + SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT notes, chord FROM chord_predictions WHERE model = ? AND notes IN ({placeholders})",
+                    [self.fingerprint, *batch]
+                )
+                found.update((keys[notes], chord) for notes, chord in rows)
+            now = time.time()
+            self._touched.update((chord_key(mask), now) for mask in found)
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, predictions):
+        """Stores {mask: prediction} pairs and evicts the least recently used entries."""
+        if not predictions:
+            return
+        now = time.time()
+        with self.transaction() as conn:
+            self._flush(conn)
+            conn.executemany(
+                "INSERT OR REPLACE INTO chord_predictions (model, notes, chord, last_used) VALUES (?, ?, ?, ?)",
+                [(self.fingerprint, chord_key(mask), str(label), now) for mask, label in predictions.items()]
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM chord_predictions").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute("""
+                    DELETE FROM chord_predictions WHERE (model, notes) IN
+                    (SELECT model, notes FROM chord_predictions ORDER BY last_used LIMIT ?)
+                """, (excess,))
+
+    def _flush(self, conn):
+        # Writes the recency and counters gathered by lookups since the last write
+        if self._touched:
+            conn.executemany("UPDATE chord_predictions SET last_used = ? WHERE model = ? AND notes = ?",
+                             [(used, self.fingerprint, notes) for notes, used in self._touched.items()])
+        if self._hits or self._misses:
+            conn.execute("UPDATE stats SET value = value + ? WHERE name = 'hits'", (self._hits,))
+            conn.execute("UPDATE stats SET value = value + ? WHERE name = 'misses'", (self._misses,))
+        self._touched = {}
+        self._hits = self._misses = 0
+
+    def stats(self):
+        """Returns the shared hit/miss counters and the current number of entries."""
+        with self.transaction() as conn:
+            self._flush(conn)
+            counters = dict(conn.execute("SELECT name, value FROM stats"))
+            size = conn.execute("SELECT COUNT(*) FROM chord_predictions").fetchone()[0]
+        lookups = counters['hits'] + counters['misses']
+        return {
+            "hits": counters['hits'],
+            "misses": counters['misses'],
+            "hit_rate": counters['hits'] / lookups if lookups else 0.0,
+            "entries": size,
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self):
+        """Removes every cached prediction and resets the counters."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM chord_predictions")
+            conn.execute("UPDATE stats SET value = 0")
+            self._touched = {}
+            self._hits = self._misses = 0
+
+    def close(self):
+        """Writes pending recency and counters, then closes the connection."""
+        with self.transaction() as conn:
+            self._flush(conn)
+        super().close()
+
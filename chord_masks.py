@@ -0,0 +1,132 @@
+import numpy as np
+
+MIDI_NOTES = 128
+MASK_WORDS = MIDI_NOTES // 64
+PITCH_CLASSES = 12
+
+# Per-byte popcounts, for NumPy builds without np.bitwise_count
+_BYTE_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def note_mask(chord):
+    """Returns the 128-bit note mask of one chord as a Python int (bit n set for MIDI note n)."""
+    mask = 0
+    for note in chord:
+        mask |= 1 << int(note)
+    return mask
+
+
+def popcount(words):
+    """Counts the set bits of uint64 words, summed over the last axis."""
+    words = np.ascontiguousarray(words, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    counts = _BYTE_POPCOUNT[words.view(np.uint8)]
+    return counts.reshape(*words.shape[:-1], -1).sum(axis=-1, dtype=np.int64)
+
+
+class ChordMasks:
+    """A batch of chords, each stored as a fixed-width 128-bit mask of its MIDI notes.
+
+    Row ``i`` of ``words`` holds chord ``i`` as two uint64 words, bit ``n`` of the
+    pair standing for MIDI note ``n``. Set operations are bitwise operations on
+    the whole batch, and note overlap is AND plus popcount. Sorted note tuples are
+    only produced at the edges, e.g. when a chord is written to a CSV.
+    """
+
+    def __init__(self, words):
+        self.words = np.ascontiguousarray(words, dtype=np.uint64).reshape(-1, MASK_WORDS)
+
+    @classmethod
+    def from_segments(cls, notes, segments, n_chords):
+        """Builds masks from a flat note array and the chord index of every note."""
+        notes = np.asarray(notes, dtype=np.uint64)
+        words = np.zeros((n_chords, MASK_WORDS), dtype=np.uint64)
+        np.bitwise_or.at(words, (np.asarray(segments, dtype=np.int64), (notes >> np.uint64(6)).astype(np.int64)),
+                         np.uint64(1) << (notes & np.uint64(63)))
+        return cls(words)
+
+    @classmethod
+    def from_chords(cls, chords):
+        """Builds masks from an iterable of note groups; notes outside the MIDI range are ignored."""
+        chords = list(chords)
+        lengths = np.fromiter((len(chord) for chord in chords), dtype=np.int64, count=len(chords))
+        notes = np.fromiter((note for chord in chords for note in chord), dtype=np.int64, count=lengths.sum())
+        segments = np.repeat(np.arange(len(chords)), lengths)
+        in_range = (notes >= 0) & (notes < MIDI_NOTES)
+        return cls.from_segments(notes[in_range], segments[in_range], len(chords))
+
+    @classmethod
+    def from_ints(cls, masks):
+        """Builds masks from Python int note masks, as returned by ``to_ints``."""
+        words = np.array([[mask & 0xFFFFFFFFFFFFFFFF, mask >> 64] for mask in masks], dtype=np.uint64)
+        return cls(words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getitem__(self, index):
+        return ChordMasks(self.words[index])
+
+    def bits(self):
+        """Returns the masks as a (n, 128) boolean note matrix."""
+        return np.unpackbits(self.words.view(np.uint8), axis=1, bitorder="little").astype(bool)
+
+    def sizes(self):
+        """Returns the number of notes in every chord."""
+        return popcount(self.words)
+
+    def overlap(self, other):
+        """Counts the notes shared with ``other`` (a ChordMasks of the same or broadcastable length)."""
+        return popcount(self.words & other.words)
+
+    def pitch_classes(self):
+        """Folds every chord onto its 12-bit pitch-class mask (bit 0 = C)."""
+        bits = self.bits()
+        classes = np.zeros(len(self), dtype=np.uint16)
+        for pitch_class in range(PITCH_CLASSES):
+            classes |= bits[:, pitch_class::PITCH_CLASSES].any(axis=1).astype(np.uint16) << pitch_class
+        return classes
+
+    def unique(self):
+        """Returns the distinct masks and, for every chord, the index of its mask among them."""
+        distinct, inverse = np.unique(self.words, axis=0, return_inverse=True)
+        return ChordMasks(distinct), inverse.reshape(-1)
+
+    def to_ints(self):
+        """Returns every mask as a Python int, for hashing and sequential scans."""
+        return [low | high << 64 for low, high in self.words.tolist()]
+
+    def tuples(self):
+        """Returns every chord as a sorted tuple of MIDI notes."""
+        rows, notes = np.nonzero(self.bits())
+        bounds = np.searchsorted(rows, np.arange(len(self) + 1)).tolist()
+        notes = notes.tolist()
+        return [tuple(notes[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def filter_similar(masks, labels, threshold=3, lookback=3):
+    """Returns the indices of the chords kept by the repetition and similarity filter.
+
+    A chord is kept when its label differs from the last kept label and it shares
+    fewer than ``threshold`` notes with each of the last ``lookback`` kept chords.
+    Labels depend on the notes alone, so a chord identical to the one right
+    before it can never be kept and those are dropped in one vectorized step;
+    the scan over the rest compares integer masks with AND and popcount.
+    """
+    if not len(masks):
+        return []
+    candidates = np.flatnonzero(np.r_[True, (masks.words[1:] != masks.words[:-1]).any(axis=1)])
+    labels = np.asarray(labels, dtype=object)[candidates].tolist()
+
+    kept, kept_masks = [], []
+    last_label = None
+    for index, mask, label in zip(candidates.tolist(), masks[candidates].to_ints(), labels):
+        if label == last_label:
+            continue
+        if any((mask & previous).bit_count() >= threshold for previous in kept_masks[-lookback:]):
+            continue
+        kept.append(index)
+        kept_masks.append(mask)
+        last_label = label
+    return kept
@@ -0,0 +1,302 @@
+"""Local chord classification service shared by the web app and the pipeline workers.
+
+One process owns the chord model and serves predictions over a Unix socket.
+Requests arriving from concurrent conversions are coalesced into micro-batches
+of up to CHORD_BATCH_SIZE chords, waiting at most CHORD_BATCH_WAIT_MS for a
+batch to fill, so the model sees a few large calls instead of many small ones.
+
+    python chord_service.py [--socket queue/chord_classifier.sock] [--batch-size 512] [--max-wait-ms 5]
+
+Add ``chord_service`` to TRACKAI_PRELOAD to run it inside the web app instead.
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from chord_masks import MASK_WORDS, ChordMasks
+
+CHORD_SERVICE_SOCKET = os.environ.get("TRACKAI_CHORD_SOCKET", "queue/chord_classifier.sock")
+CHORD_BATCH_SIZE = int(os.environ.get("TRACKAI_CHORD_BATCH_SIZE", 512))
+CHORD_BATCH_WAIT_MS = float(os.environ.get("TRACKAI_CHORD_BATCH_WAIT_MS", 5))
+CLIENT_TIMEOUT = 30
+
+# A request is a chord count followed by the chords' mask words; a reply is a length-prefixed JSON object
+HEADER = struct.Struct(">I")
+MASK_BYTES = MASK_WORDS * 8
+
+
+class ChordServiceError(RuntimeError):
+    """The service answered a request with an error, or with a reply that does not fit it."""
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        data += chunk
+    return bytes(data)
+
+
+def _send_reply(sock, reply):
+    payload = json.dumps(reply).encode()
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+class MicroBatcher:
+    """Coalesces concurrent prediction requests into batched classifier calls.
+
+    ``submit`` queues a ChordMasks and returns a Future for its labels. A single
+    thread takes the first waiting request, keeps collecting requests until the
+    batch holds ``batch_size`` chords or ``max_wait_ms`` has passed, classifies
+    the whole batch at once and hands every caller its slice of the labels.
+    """
+
+    def __init__(self, classifier=None, batch_size=CHORD_BATCH_SIZE, max_wait_ms=CHORD_BATCH_WAIT_MS):
+        self.classifier = classifier
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self.chords = 0
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="chord-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, masks):
+        """Queues a ChordMasks for classification and returns a Future resolving to its labels."""
+        future = Future()
+        self._requests.put((masks, future))
+        return future
+
+    def close(self):
+        """Stops the batching thread once the requests already queued are answered."""
+        self._requests.put(None)
+
+    def stats(self):
+        """Returns the number of requests, chords and model calls so far."""
+        return {"requests": self.requests, "chords": self.chords, "batches": self.batches}
+
+    def _collect(self, first):
+        batch, size = [first], len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._requests.put(None)  # let _run see the stop marker after this batch
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._requests.get()
+            if first is None:
+                return
+            batch = [request for request in self._collect(first) if request[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                if self.classifier is None:
+                    from classifier import get_classifier
+                    self.classifier = get_classifier()
+                words = np.concatenate([masks.words for masks, _ in batch])
+                labels = self.classifier.predict(ChordMasks(words))
+            except BaseException as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            self.chords += len(words)
+            start = 0
+            for masks, future in batch:
+                future.set_result([str(label) for label in labels[start:start + len(masks)]])
+                start += len(masks)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # Clients keep their connection open and send one request after another
+        while True:
+            try:
+                (count,) = HEADER.unpack(_recv_exactly(self.request, HEADER.size))
+                masks = ChordMasks(np.frombuffer(_recv_exactly(self.request, count * MASK_BYTES), dtype="<u8"))
+            except ConnectionError:
+                return
+            try:
+                reply = {"labels": self.server.batcher.submit(masks).result()}
+            except Exception as e:
+                reply = {"error": str(e)}
+            _send_reply(self.request, reply)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # every pipeline worker may connect at once
+
+
+class ChordService:
+    """The Unix socket server in front of a MicroBatcher."""
+
+    def __init__(self, path=CHORD_SERVICE_SOCKET, batch_size=CHORD_BATCH_SIZE,
+                 max_wait_ms=CHORD_BATCH_WAIT_MS, classifier=None):
+        self.path = path
+        self.batcher = MicroBatcher(classifier, batch_size, max_wait_ms)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            if _is_listening(path):
+                raise RuntimeError(f"A chord service is already listening on {path}")
+            os.unlink(path)  # left behind by a service that did not shut down cleanly
+        self.server = _Server(path, _RequestHandler)
+        self.server.batcher = self.batcher
+
+    def serve_forever(self):
+        """Serves requests on the calling thread until ``shutdown`` is called."""
+        self.server.serve_forever()
+
+    def start(self):
+        """Serves requests on a background thread and returns the service."""
+        threading.Thread(target=self.serve_forever, name="chord-service", daemon=True).start()
+        return self
+
+    def shutdown(self):
+        """Stops serving and removes the socket file."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.batcher.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def _is_listening(path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+        return True
+    except OSError:
+        return False
+
+
+class ChordServiceClient:
+    """Sends chords to the classification service; each thread keeps its own connection."""
+
+    def __init__(self, path=CHORD_SERVICE_SOCKET, timeout=CLIENT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def close(self):
+        """Closes the calling thread's connection."""
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def predict(self, chords):
+        """Returns a label for every chord of a ChordMasks or list of note groups."""
+        masks = chords if isinstance(chords, ChordMasks) else ChordMasks.from_chords(chords)
+        sock = self._connection()
+        try:
+            sock.sendall(HEADER.pack(len(masks)) + masks.words.astype("<u8", copy=False).tobytes())
+            (size,) = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+            reply = json.loads(_recv_exactly(sock, size))
+        except (OSError, ValueError):
+            # Timed out or garbled: the connection may be out of step with the service, start a new one
+            self.close()
+            raise
+        if "error" in reply:
+            raise ChordServiceError(f"Chord service error: {reply['error']}")
+        if len(reply.get("labels", ())) != len(masks):
+            raise ChordServiceError(f"Chord service returned {len(reply.get('labels', ()))} labels for {len(masks)} chords")
+        return reply["labels"]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def predict(chords, path=CHORD_SERVICE_SOCKET):
+    """Classifies chords through the service, or returns None when no service is running or it fails."""
+    global _client
+    if not os.path.exists(path):
+        return None
+    with _client_lock:
+        if _client is None or _client.path != path:
+            _client = ChordServiceClient(path)
+        client = _client
+    try:
+        return client.predict(chords)
+    except (OSError, ValueError, ChordServiceError) as e:
+        print(f"⚠️ Chord service failed ({e}), predicting in-process")
+        return None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def start_service():
+    """Starts the process-wide chord service on a background thread, once."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ChordService().start()
+            print(f"✅ Chord classification service listening on {_service.path}")
+        return _service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve chord predictions over a Unix socket")
+    parser.add_argument("--socket", default=CHORD_SERVICE_SOCKET)
+    parser.add_argument("--batch-size", type=int, default=CHORD_BATCH_SIZE, help="most chords per model call")
+    parser.add_argument("--max-wait-ms", type=float, default=CHORD_BATCH_WAIT_MS, help="longest wait for a batch to fill")
+    args = parser.parse_args()
+
+    from classifier import get_classifier
+
+    service = ChordService(args.socket, args.batch_size, args.max_wait_ms, classifier=get_classifier())
+    print(f"✅ Chord classification service listening on {args.socket} "
+          f"(batches of up to {args.batch_size} chords, {args.max_wait_ms:g} ms wait)")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+        stats = service.batcher.stats()
+        print(f"🛑 Served {stats['requests']} requests ({stats['chords']} chords) in {stats['batches']} batches")
+
+
+if __name__ == '__main__':
+    main()
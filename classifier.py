@@ -0,0 +1,120 @@
+import os
+import threading
+
+import numpy as np
+
+from chord_masks import MIDI_NOTES, ChordMasks
+
+UNKNOWN_CHORD = "Unknown"
+
+CHORD_MODEL_PATH = "model/chord_classifier.pkl"
+NOTES_ENCODER_PATH = "model/notes_encoder.pkl"
+CHORD_CACHE_PATH = os.environ.get("TRACKAI_CHORD_CACHE", "cache/chord_predictions.sqlite")
+CHORD_CACHE_SIZE = 50000
+# Serve predictions from the exported NumPy bundle (see mlp_engine.py) when it matches the model files
+USE_MLP_ENGINE = os.environ.get("TRACKAI_MLP_ENGINE", "1") != "0"
+
+
+class NoteEncoder:
+    """Binarizes chords into the classifier's note features straight from their note masks.
+
+    Produces the same feature matrix as ``MultiLabelBinarizer.transform`` for the
+    fitted ``classes_``: the columns are the fitted notes picked out of the
+    unpacked 128-bit masks. Notes the encoder was not fitted on are ignored, as
+    with the binarizer.
+    """
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        notes = self.classes_.astype(np.int64)
+        self.known = (notes >= 0) & (notes < MIDI_NOTES)
+        self.notes = notes[self.known]
+
+    def transform(self, chords):
+        """Encodes a ChordMasks (or a list of note groups) into a (len(chords), n_classes) 0/1 matrix."""
+        if not isinstance(chords, ChordMasks):
+            chords = ChordMasks.from_chords(chords)
+        features = np.zeros((len(chords), len(self.classes_)), dtype=np.int64)
+        features[:, self.known] = chords.bits()[:, self.notes]
+        return features
+
+
+def predict_chords(model, encoder, chords, cache=None):
+    """Predicts a chord label for every chord with a single model call.
+
+    ``chords`` is a ChordMasks, or a list of note groups which is converted once.
+    Repeated chords are classified once, so the cost scales with the number of
+    distinct chords in the song. When a ``ChordCache`` is given, cached note
+    masks skip the model entirely. Empty chords are labelled ``Unknown``.
+    """
+    masks = chords if isinstance(chords, ChordMasks) else ChordMasks.from_chords(chords)
+    distinct, inverse = masks.unique()
+    keys = distinct.to_ints()
+    labels = cache.get_many([key for key in keys if key]) if cache is not None else {}
+    missing = [i for i, key in enumerate(keys) if key and key not in labels]
+    if missing:
+        predicted = dict(zip([keys[i] for i in missing], model.predict(encoder.transform(distinct[missing]))))
+        if cache is not None:
+            cache.put_many(predicted)
+        labels.update(predicted)
+    distinct_labels = np.array([labels[key] if key else UNKNOWN_CHORD for key in keys], dtype=object)
+    return distinct_labels[inverse].tolist()
+
+
+class ChordClassifier:
+    """The trained chord model together with its note encoder and prediction cache.
+
+    When an up-to-date export of the model exists at ``bundle_path`` it is
+    memory-mapped and run by ``MLPEngine``, and neither joblib nor scikit-learn
+    is imported; otherwise the pickled model is loaded as before.
+    """
+
+    def __init__(self, model_path=CHORD_MODEL_PATH, encoder_path=NOTES_ENCODER_PATH,
+                 cache_path=CHORD_CACHE_PATH, cache_size=CHORD_CACHE_SIZE, bundle_path=None):
+        from chord_cache import ChordCache
+        from mlp_engine import MANIFEST, MLP_BUNDLE_PATH
+
+        bundle_path = bundle_path or MLP_BUNDLE_PATH
+        self.model = self._load_engine(model_path, encoder_path, bundle_path) if USE_MLP_ENGINE else None
+        # The cache is keyed on the same files whichever model serves, so toggling TRACKAI_MLP_ENGINE keeps it;
+        # the bundle may hold a compressed model and its manifest carries a hash of the weights
+        sources = [model_path, encoder_path]
+        if os.path.exists(os.path.join(bundle_path, MANIFEST)):
+            sources.append(os.path.join(bundle_path, MANIFEST))
+        if self.model is not None:
+            self.encoder = NoteEncoder(self.model.note_classes)
+        else:
+            import joblib
+            self.model = joblib.load(model_path)
+            self.encoder = NoteEncoder(joblib.load(encoder_path).classes_)
+        self.cache = ChordCache(cache_path, sources, max_entries=cache_size) if cache_path else None
+
+    @staticmethod
+    def _load_engine(model_path, encoder_path, bundle_path):
+        from chord_cache import file_fingerprint
+        from mlp_engine import MLPEngine, read_manifest
+
+        manifest = read_manifest(bundle_path)
+        if manifest is None:
+            return None
+        if manifest.get("source_fingerprint") != file_fingerprint(model_path, encoder_path):
+            print(f"⚠️ {bundle_path} is older than {model_path}; re-run 'python mlp_engine.py export'")
+            return None
+        return MLPEngine(bundle_path)
+
+    def predict(self, chords):
+        """Predicts a chord label for every chord of a ChordMasks or list of note groups."""
+        return predict_chords(self.model, self.encoder, chords, cache=self.cache)
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier():
+    """Returns the process-wide chord classifier, loading it on first use."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = ChordClassifier()
+        return _classifier
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+import time
+
+from sqlite_store import SQLiteStore
+
+EVENTS_DB_PATH = os.environ.get("TRACKAI_EVENTS_DB", "queue/events.sqlite")
+EVENT_RETENTION = 24 * 3600  # seconds
+PRUNE_EVERY = 1000  # events
+
+
+def song_channel(stem_dir):
+    """Returns the event channel of a song: the name of its stem folder, as used in URLs."""
+    return os.path.basename(os.path.normpath(stem_dir))
+
+
+class EventLog(SQLiteStore):
+    """Append-only log of per-song progress events.
+
+    Job handlers, pipeline stages and the analysis code append events to the
+    channel of the song they work on, from whichever process they run in. The
+    SSE route tails a channel by event id, so a browser that reconnects picks up
+    exactly where it left off. Events older than EVENT_RETENTION are pruned.
+    """
+
+    def __init__(self, path=EVENTS_DB_PATH, retention=EVENT_RETENTION):
+        super().__init__(path)
+        self.retention = retention
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS events_channel ON events (channel, id)")
+
+    def publish(self, channel, kind, data):
+        """Appends an event to a channel and returns its id."""
+        with self.transaction() as conn:
+            event_id = conn.execute(
+                "INSERT INTO events (channel, kind, data, created_at) VALUES (?, ?, ?, ?)",
+                (channel, kind, json.dumps(data), time.time())
+            ).lastrowid
+            if event_id % PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM events WHERE created_at < ?", (time.time() - self.retention,))
+        return event_id
+
+    def since(self, channel, after=0, limit=500):
+        """Returns up to ``limit`` (id, kind, data JSON) events of a channel newer than ``after``."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, kind, data FROM events WHERE channel = ? AND id > ? ORDER BY id LIMIT ?",
+                (channel, after, limit)
+            ).fetchall()
+
+    def last_id(self, channel):
+        """Returns the id of the newest event of a channel, or 0."""
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) FROM events WHERE channel = ?", (channel,)).fetchone()
+        return row[0] or 0
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_event_log():
+    """Returns the process-wide event log."""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = EventLog()
+        return _log
+
+
+def publish(channel, kind, **data):
+    """Appends an event to a song's channel; a failing event log never fails the work reporting to it."""
+    try:
+        return get_event_log().publish(channel, kind, data)
+    except Exception as e:
+        print(f"⚠️ Could not publish {kind} event: {e}")
+        return None
@@ -0,0 +1,200 @@
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+from sqlite_store import SQLiteStore
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+POLL_INTERVAL = 1.0
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue(SQLiteStore):
+    """Persistent background job queue backed by a local SQLite database.
+
+    Routes ``enqueue`` a job kind plus a JSON payload and get a job id back
+    immediately; a pool of worker threads claims queued jobs and runs the
+    handler registered for their kind. Handlers receive the payload and a
+    ``progress(fraction, message)`` callback and return a JSON-serializable
+    result. Jobs survive a restart of the web process: anything still queued is
+    picked up again and jobs whose owning process died mid-run are re-queued.
+    """
+
+    def __init__(self, path, handlers, workers=2):
+        super().__init__(path)
+        self.handlers = dict(handlers)
+        self.workers = workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._stopped = threading.Event()
+
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    result TEXT,
+                    result_url TEXT,
+                    error TEXT,
+                    owner TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, state)")
+
+    def start(self):
+        """Re-queues jobs orphaned by a dead process and starts the worker threads, once."""
+        with self._wakeup:
+            if self._threads:
+                return
+            self.requeue_orphans()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        """Asks the worker threads to exit after their current job."""
+        self._stopped.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def requeue_orphans(self):
+        """Puts running jobs back in the queue when the process that claimed them is gone."""
+        host = socket.gethostname()
+        with self.transaction() as conn:
+            rows = conn.execute("SELECT id, owner FROM jobs WHERE state = ?", (RUNNING,)).fetchall()
+            orphans = []
+            for job_id, owner in rows:
+                owner_host, _, pid = (owner or "").rpartition(":")
+                if owner_host == host and pid.isdigit() and int(pid) != os.getpid() and _pid_alive(int(pid)):
+                    continue
+                orphans.append(job_id)
+            conn.executemany(
+                "UPDATE jobs SET state = ?, owner = NULL, progress = 0, message = 'Re-queued after restart', updated_at = ? WHERE id = ?",
+                [(QUEUED, time.time(), job_id) for job_id in orphans]
+            )
+        if orphans:
+            print(f"🔄 Re-queued {len(orphans)} interrupted job(s)")
+        return orphans
+
+    def enqueue(self, kind, payload, result_url=None):
+        """Queues a job and returns its id; an identical job still pending is reused."""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        key = f"{kind}:{json.dumps(payload, sort_keys=True)}"
+        now = time.time()
+        with self.transaction() as conn:
+            placeholders = ",".join("?" * len(ACTIVE_STATES))
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE key = ? AND state IN ({placeholders})", (key, *ACTIVE_STATES)
+            ).fetchone()
+            if row:
+                return row[0]
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, key, payload, state, result_url, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, key, json.dumps(payload), QUEUED, result_url, now, now)
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Returns a job's state, progress and result as a dict, or None if unknown."""
+        with self._lock:
+            self._conn.row_factory = _dict_row
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, state, progress, message, result, result_url, error, created_at, updated_at FROM jobs WHERE id = ?",
+                    (job_id,)
+                ).fetchone()
+            finally:
+                self._conn.row_factory = None
+        if row and row["result"] is not None:
+            row["result"] = json.loads(row["result"])
+        return row
+
+    def update_progress(self, job_id, fraction, message=None):
+        """Records how far a running job has got."""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, message = COALESCE(?, message), updated_at = ? WHERE id = ?",
+                (max(0.0, min(1.0, fraction)), message, time.time(), job_id)
+            )
+
+    def _claim(self):
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE state = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = ?, owner = ?, message = 'Started', updated_at = ? WHERE id = ?",
+                (RUNNING, self.owner, time.time(), row[0])
+            )
+        return row[0], row[1], json.loads(row[2])
+
+    def _finish(self, job_id, state, result=None, error=None):
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, progress = CASE WHEN ? = ? THEN 1 ELSE progress END, message = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (state, state, DONE, "Finished" if state == DONE else "Failed",
+                 json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def run_next(self):
+        """Claims and runs one queued job; returns False when the queue is empty."""
+        claimed = self._claim()
+        if claimed is None:
+            return False
+        job_id, kind, payload = claimed
+        print(f"🔄 Running {kind} job {job_id}")
+        try:
+            result = self.handlers[kind](payload, lambda fraction, message=None: self.update_progress(job_id, fraction, message))
+        except Exception as e:
+            traceback.print_exc()
+            self._finish(job_id, FAILED, error=str(e))
+            print(f"❌ {kind} job {job_id} failed: {e}")
+        else:
+            self._finish(job_id, DONE, result=result)
+            print(f"✅ {kind} job {job_id} finished")
+        return True
+
+    def _work(self):
+        while not self._stopped.is_set():
+            if self.run_next():
+                continue
+            with self._wakeup:
+                self._wakeup.wait(POLL_INTERVAL)
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
@@ -0,0 +1,45 @@
+"""Prints chord labels for a live audio stream read from stdin.
+
+The stream is raw little-endian 16-bit mono PCM, for example from a microphone:
+
+    ffmpeg -loglevel quiet -f pulse -i default -f s16le -ac 1 -ar 22050 - | python live_chords.py
+"""
+import argparse
+import sys
+
+from realtime import LIVE_FRAME_MS, LIVE_LATENCY_BUDGET_MS, LIVE_SAMPLE_RATE, LIVE_WINDOW_MS, LiveChordRecognizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live chord recognition from PCM on stdin")
+    parser.add_argument("--rate", type=int, default=LIVE_SAMPLE_RATE, help="sample rate of the input")
+    parser.add_argument("--frame-ms", type=float, default=LIVE_FRAME_MS, help="time between chord labels")
+    parser.add_argument("--window-ms", type=float, default=LIVE_WINDOW_MS, help="audio analyzed per label")
+    parser.add_argument("--latency-ms", type=float, default=LIVE_LATENCY_BUDGET_MS, help="latency budget per frame")
+    parser.add_argument("--all", action="store_true", help="print every frame, not only chord changes")
+    args = parser.parse_args()
+
+    recognizer = LiveChordRecognizer(sample_rate=args.rate, frame_ms=args.frame_ms, window_ms=args.window_ms,
+                                     latency_budget_ms=args.latency_ms)
+    read_size = recognizer.hop * 2  # one frame of 16-bit samples
+    stream = sys.stdin.buffer
+    over_budget = 0
+
+    print(f"🎸 Listening at {args.rate} Hz, one label every {args.frame_ms:.0f} ms", file=sys.stderr)
+    while True:
+        data = stream.read(read_size)
+        if not data:
+            break
+        for result in recognizer.feed_pcm16(data[:len(data) - len(data) % 2]):
+            if args.frame_ms + result["latency_ms"] > args.latency_ms:
+                over_budget += 1
+            if args.all or result["changed"]:
+                notes = " ".join(str(note) for note in result["notes"])
+                print(f"{result['time']:8.2f}s  {result['chord']:<10} [{notes}]  {result['latency_ms']:.1f} ms", flush=True)
+
+    if over_budget:
+        print(f"⚠️ {over_budget} frame(s) exceeded the {args.latency_ms:.0f} ms latency budget", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
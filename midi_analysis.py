@@ -0,0 +1,317 @@
+import os
+import mido
+import numpy as np
+import pandas as pd
+from analysis_store import get_analysis_store
+from chord_masks import MASK_WORDS, ChordMasks, filter_similar
+import chord_service
+from classifier import get_classifier
+from events import publish, song_channel
+from midi_events import read_midi_notes
+from midi_transcription import get_midi_engine, pitched_stems
+
+# An onset more than TIME_THRESHOLD_MS after the previous one starts a new chord; a repeated note
+# more than MERGE_THRESHOLD_MS after the previous message of that note starts a new range
+TIME_THRESHOLD_MS = float(os.environ.get("TRACKAI_CHORD_GAP_MS", 50))
+MERGE_THRESHOLD_MS = float(os.environ.get("TRACKAI_MERGE_GAP_MS", 1000))
+RECONSTRUCTED_NOTE_LENGTH = 200  # milliseconds
+# Write the _processed.mid and _reconstructed.mid intermediates next to the CSVs, for debugging
+KEEP_INTERMEDIATE_MIDI = os.environ.get("TRACKAI_KEEP_INTERMEDIATE_MIDI", "0") == "1"
+CHORD_EVENT_BATCH = 50  # chord rows per progress event
+
+# Merged note ranges and reconstructed onsets; times are absolute whole milliseconds, so threshold
+# comparisons are exact and the intermediate MIDI files can hold them in their message time fields
+NOTE_RANGE_DTYPE = np.dtype([("track", np.uint16), ("note", np.uint8), ("start", np.int64), ("end", np.int64)])
+ONSET_DTYPE = np.dtype([("note", np.uint8), ("time", np.int64)])
+
+def convert_to_midi(wav_file):
+    """Converts a WAV file to MIDI, processes it, reconstructs it, and extracts chords."""
+    if not os.path.exists(wav_file):
+        print(f"❌ Error: File {wav_file} not found.")
+        return None
+
+    midi_file = get_midi_engine().transcribe([wav_file])[wav_file]
+    if not midi_file:
+        return None
+    print(f"✅ MIDI file ready: {midi_file}")
+    return analyze_midi(midi_file, wav_file)
+
+def convert_song_to_midi(stem_dir, progress=None):
+    """Converts all pitched stems of a separated song to MIDI in one batch, then analyzes each."""
+    wav_files = pitched_stems(stem_dir)
+    if not wav_files:
+        print(f"❌ Error: No stems found in {stem_dir}.")
+        return None
+
+    midi_files = get_midi_engine().transcribe(wav_files)
+    results = {}
+    for i, (wav_file, midi_file) in enumerate(midi_files.items()):
+        if progress:
+            progress(0.5 + 0.5 * i / len(midi_files), f"Analyzing {os.path.basename(wav_file)}")
+        results[os.path.basename(wav_file)] = analyze_midi(midi_file, wav_file) if midi_file else None
+    return results
+
+def analyze_midi(midi_file, wav_file, keep_intermediate=None):
+    """Extracts a stem's chords and notes from its basic-pitch MIDI in a single in-memory pass.
+
+    The MIDI is parsed once; merging, reconstruction, chord detection and note
+    extraction all work on the parsed events and only the final CSVs are
+    written. With ``keep_intermediate`` (default: TRACKAI_KEEP_INTERMEDIATE_MIDI)
+    the _processed.mid and _reconstructed.mid files are written as well.
+    """
+    if keep_intermediate is None:
+        keep_intermediate = KEEP_INTERMEDIATE_MIDI
+
+    midi_notes = read_midi_notes(midi_file)
+    merged = merge_notes(midi_notes.events)
+    onsets = reconstruct_onsets(midi_notes.events, merged)
+
+    if keep_intermediate:
+        processed_midi = midi_file.replace(".mid", "_processed.mid")
+        write_processed_midi(merged, midi_notes.tracks, processed_midi)
+        print(f"✅ Processed MIDI saved as {processed_midi}")
+        reconstructed_midi = processed_midi.replace("_processed.mid", "_reconstructed.mid")
+        write_reconstructed_midi(onsets, reconstructed_midi)
+        print(f"✅ Reconstructed MIDI saved as {reconstructed_midi}")
+
+    output_folder = os.path.dirname(midi_file)
+    wav_filename = os.path.basename(wav_file).replace(".wav", "")
+    song = song_channel(os.path.dirname(wav_file))
+    chords = group_chords(onsets)
+    kept, predictions = classify_and_filter(chords)
+    filtered_chords = list(zip(chords[kept].tuples(), [predictions[i] for i in kept]))
+    publish_chords(song, wav_filename, filtered_chords)
+    store_analysis(song, wav_filename, filtered_chords, chord_times(onsets)[kept], onsets)
+    chords_csv_path = write_chords(filtered_chords, output_folder, wav_filename)
+    notes_csv_path = save_notes(onsets["note"], output_folder, wav_filename)
+
+    if notes_csv_path:
+        print(f"✅ Notes saved in {notes_csv_path}")
+
+    if chords_csv_path:
+        print(f"✅ Chord detection complete. Chords saved in {chords_csv_path}")
+    return {"status": "success", "message": "MIDI conversion complete, chords and notes extracted"}
+
+def merge_notes(events, threshold_ms=None):
+    """Merges repeated hits of the same note per track into note ranges.
+
+    Event times are converted to absolute milliseconds once. Within each
+    (track, note) a note-on more than ``threshold_ms`` (default:
+    MERGE_THRESHOLD_MS) after the previous message of that note starts a new
+    range; the last range of every note is kept, ordered by track and by the
+    note's first note-on. Works on the whole event array at once instead of
+    message by message.
+    """
+    if threshold_ms is None:
+        threshold_ms = MERGE_THRESHOLD_MS
+    position = np.arange(len(events))
+    order = np.lexsort((position, events["note"], events["track"]))
+    grouped = events[order]
+    key = grouped["track"].astype(np.int64) * 128 + grouped["note"]
+    first_in_group = np.r_[True, key[1:] != key[:-1]]
+
+    # Note-offs before a note's first note-on in the track are ignored
+    ons_so_far = np.cumsum(grouped["on"])
+    ons_before_group = (ons_so_far - grouped["on"])[first_in_group]
+    started = ons_so_far - ons_before_group[np.cumsum(first_in_group) - 1] > 0
+    grouped, order, key = grouped[started], order[started], key[started]
+
+    if not len(grouped):
+        return np.empty(0, dtype=NOTE_RANGE_DTYPE)
+
+    time = to_milliseconds(grouped["seconds"])
+    first_in_group = np.r_[True, key[1:] != key[:-1]]
+    last_in_group = np.r_[first_in_group[1:], True]
+    opens_range = grouped["on"] & (first_in_group | (np.r_[0, np.diff(time)] > threshold_ms))
+    last_opening = np.maximum.accumulate(np.where(opens_range, np.arange(len(grouped)), 0))
+
+    merged = np.empty(np.count_nonzero(first_in_group), dtype=NOTE_RANGE_DTYPE)
+    merged["track"] = grouped["track"][last_in_group]
+    merged["note"] = grouped["note"][last_in_group]
+    merged["start"] = time[last_opening[last_in_group]]
+    merged["end"] = time[last_in_group]
+    return merged[np.argsort(order[first_in_group], kind="stable")]
+
+def reconstruct_onsets(events, merged):
+    """Replays the original note-on order with each note's merged start time."""
+    # The first merged range of every pitch wins, as in the reconstructed MIDI
+    start_times = np.zeros(128, dtype=np.int64)
+    has_range = np.zeros(128, dtype=bool)
+    pitches, first = np.unique(merged["note"], return_index=True)
+    start_times[pitches] = merged["start"][first]
+    has_range[pitches] = True
+
+    notes = events["note"][events["on"]]
+    notes = notes[has_range[notes]]
+    onsets = np.empty(len(notes), dtype=ONSET_DTYPE)
+    onsets["note"] = notes
+    onsets["time"] = start_times[notes]
+    return onsets
+
+def to_milliseconds(seconds):
+    """Converts event times in seconds to whole milliseconds."""
+    return np.rint(np.asarray(seconds) * 1e3).astype(np.int64)
+
+def group_chords(onsets, threshold_ms=None):
+    """Splits onsets into chords wherever the time jumps ahead of the previous onset by more than ``threshold_ms``.
+
+    Boundaries come from one ``np.diff`` over the whole stem and the chords are
+    returned as ChordMasks (default threshold: TIME_THRESHOLD_MS).
+    """
+    if not len(onsets):
+        return ChordMasks(np.empty((0, MASK_WORDS), dtype=np.uint64))
+    segment = chord_segments(onsets, threshold_ms)
+    return ChordMasks.from_segments(onsets["note"], segment, segment[-1] + 1)
+
+def chord_segments(onsets, threshold_ms=None):
+    """Returns the chord index of every onset, as used by ``group_chords``."""
+    if threshold_ms is None:
+        threshold_ms = TIME_THRESHOLD_MS
+    return np.r_[0, np.cumsum(np.diff(onsets["time"]) > threshold_ms)]
+
+def chord_times(onsets, threshold_ms=None):
+    """Returns the time in milliseconds of each chord's first onset, aligned with ``group_chords``."""
+    if not len(onsets):
+        return np.empty(0, dtype=np.int64)
+    starts = np.r_[0, np.flatnonzero(np.diff(chord_segments(onsets, threshold_ms))) + 1]
+    return onsets["time"][starts]
+
+def classify_chords(chords):
+    """Labels chords through the shared chord service when it runs, otherwise with the in-process model."""
+    predictions = chord_service.predict(chords)
+    return predictions if predictions is not None else get_classifier().predict(chords)
+
+def classify_and_filter(chords):
+    """Classifies a ChordMasks and returns the indices of the chords kept by ``filter_similar`` with all labels."""
+    # Predict all chords in one batched call, then filter on the note masks
+    predictions = classify_chords(chords)
+    return filter_similar(chords, predictions), predictions
+
+def filter_chords(chords):
+    """Classifies chords and drops immediate repetitions and chords similar to the last few kept."""
+    if not isinstance(chords, ChordMasks):
+        chords = ChordMasks.from_chords(chords)
+    kept, predictions = classify_and_filter(chords)
+    return list(zip(chords[kept].tuples(), [predictions[i] for i in kept]))
+
+def store_analysis(song, stem, filtered_chords, times, onsets):
+    """Records a stem's kept chords with their start times, and its note onsets, in the analysis store."""
+    chords = [(time_ms * 1000, notes, label) for time_ms, (notes, label) in zip(times.tolist(), filtered_chords)]
+    get_analysis_store().save_stem(song, stem, chords, zip((onsets["time"] * 1000).tolist(), onsets["note"].tolist()))
+
+def publish_chords(channel, stem, filtered_chords):
+    """Streams a stem's chord rows to the song's event channel in batches of CHORD_EVENT_BATCH.
+
+    Rows arrive per stem: basic-pitch transcribes a whole stem at once, and its
+    chords are classified and filtered together as soon as its MIDI exists.
+    """
+    rows = [[str(notes), str(prediction)] for notes, prediction in filtered_chords]
+    for start in range(0, len(rows), CHORD_EVENT_BATCH):
+        publish(channel, "chords", stem=stem, start=start, rows=rows[start:start + CHORD_EVENT_BATCH])
+
+def save_chords(chords, output_folder, wav_filename):
+    """Classifies and filters chords and saves them to <wav_filename>_filtered_chords.csv."""
+    return write_chords(filter_chords(chords), output_folder, wav_filename)
+
+def write_chords(filtered_chords, output_folder, wav_filename):
+    """Saves filtered (notes, prediction) rows to <wav_filename>_filtered_chords.csv."""
+    df = pd.DataFrame(filtered_chords, columns=["Notes", "Predicted Chord"])
+
+    # Save CSV with the correct WAV-based name
+    chords_csv_path = os.path.join(output_folder, f"{wav_filename}_filtered_chords.csv")
+    df.to_csv(chords_csv_path, index=False)
+
+    print(f"✅ Filtered chords saved in {chords_csv_path}")
+    return chords_csv_path
+
+def save_notes(notes, output_folder, wav_filename):
+    """Saves the note sequence to <wav_filename>_notes.csv."""
+    df = pd.DataFrame(notes, columns=["Note"])
+
+    # Save CSV with the correct WAV-based name
+    notes_csv_path = os.path.join(output_folder, f"{wav_filename}_notes.csv")
+    df.to_csv(notes_csv_path, index=False)
+
+    print(f"✅ Notes saved in {notes_csv_path}")
+    return notes_csv_path
+
+def write_processed_midi(merged, n_tracks, path):
+    """Writes merged note ranges as a MIDI file with one track per original track.
+
+    Each message's time field holds the absolute start or end of its range in
+    milliseconds rather than a delta; the file is a debugging aid that only
+    ``reconstruct_midi`` reads back.
+    """
+    filtered_midi = mido.MidiFile()
+    for track in range(n_tracks):
+        new_track = mido.MidiTrack()
+        for note, start_time, end_time in merged[["note", "start", "end"]][merged["track"] == track].tolist():
+            new_track.append(mido.Message("note_on", note=note, velocity=64, time=start_time))
+            new_track.append(mido.Message("note_off", note=note, velocity=0, time=end_time))
+        filtered_midi.tracks.append(new_track)
+    filtered_midi.save(path)
+
+def write_reconstructed_midi(onsets, path):
+    """Writes reconstructed onsets as a single-track MIDI file of fixed-length notes, times as in ``write_processed_midi``."""
+    reconstructed_midi = mido.MidiFile()
+    new_track = mido.MidiTrack()
+    for note, time in onsets.tolist():
+        new_track.append(mido.Message("note_on", note=note, velocity=64, time=time))
+        new_track.append(mido.Message("note_off", note=note, velocity=0, time=time + RECONSTRUCTED_NOTE_LENGTH))
+    reconstructed_midi.tracks.append(new_track)
+    reconstructed_midi.save(path)
+
+def process_midi(midi_path):
+    """Processes the MIDI file by merging repeated hits of each note into note ranges."""
+    processed_midi_path = midi_path.replace(".mid", "_processed.mid")
+    midi_notes = read_midi_notes(midi_path)
+    write_processed_midi(merge_notes(midi_notes.events), midi_notes.tracks, processed_midi_path)
+
+    print(f"✅ Processed MIDI saved as {processed_midi_path}")
+    return processed_midi_path
+
+def reconstruct_midi(original_midi, processed_midi):
+    """Reorders the processed MIDI according to the original sequence."""
+    onsets = reconstruct_onsets(read_midi_notes(original_midi).events, merged_from_processed(processed_midi))
+
+    reconstructed_path = processed_midi.replace("_processed.mid", "_reconstructed.mid")
+    write_reconstructed_midi(onsets, reconstructed_path)
+
+    print(f"✅ Reconstructed MIDI saved as {reconstructed_path}")
+    return reconstructed_path
+
+def merged_from_processed(processed_midi):
+    """Reads note ranges back from a _processed.mid file written by process_midi."""
+    events = read_midi_notes(processed_midi).events
+    events = events[events["on"]]
+    merged = np.empty(len(events), dtype=NOTE_RANGE_DTYPE)
+    merged["track"] = events["track"]
+    merged["note"] = events["note"]
+    merged["start"] = events["delta"]
+    merged["end"] = events["delta"]
+    return merged
+
+def read_onsets(midi_path):
+    """Reads the note-ons of an intermediate MIDI file in file order, times as in ``write_processed_midi``."""
+    events = read_midi_notes(midi_path).events
+    events = events[events["on"]]
+    onsets = np.empty(len(events), dtype=ONSET_DTYPE)
+    onsets["note"] = events["note"]
+    onsets["time"] = events["delta"]
+    return onsets
+
+def detect_chords(midi_path, wav_filename):
+    """Detects chords in the MIDI file, avoiding immediate repetitions and filtering out similar chords."""
+    if not os.path.exists(midi_path):
+        print(f"❌ Error: MIDI file {midi_path} not found.")
+        return None
+
+    return save_chords(group_chords(read_onsets(midi_path)), os.path.dirname(midi_path), wav_filename)
+
+def detect_notes(midi_path, wav_filename):
+    """Extracts notes from the MIDI file and saves them to a CSV."""
+    if not os.path.exists(midi_path):
+        print(f"❌ Error: MIDI file {midi_path} not found.")
+        return None
+
+    return save_notes(read_onsets(midi_path)["note"], os.path.dirname(midi_path), wav_filename)
@@ -0,0 +1,141 @@
+from collections import namedtuple
+
+import numpy as np
+
+DEFAULT_TEMPO = 500000  # microseconds per beat (120 bpm), as in the MIDI spec
+
+# One row per note message. ``delta`` is the tick distance to the previous message of
+# any kind in the same track, which is what mido exposes as ``msg.time``.
+NOTE_EVENT_DTYPE = np.dtype([
+    ("track", np.uint16),
+    ("tick", np.int64),
+    ("delta", np.int64),
+    ("seconds", np.float64),
+    ("note", np.uint8),
+    ("velocity", np.uint8),
+    ("on", np.bool_),
+])
+
+MidiNotes = namedtuple("MidiNotes", ["events", "tracks", "ticks_per_beat"])
+
+# Data bytes that follow each channel-message status nibble
+_DATA_LENGTHS = {0x8: 2, 0x9: 2, 0xA: 2, 0xB: 2, 0xC: 1, 0xD: 1, 0xE: 2}
+
+
+def read_midi_notes(path):
+    """Decodes the note messages of a standard MIDI file straight into a structured NumPy array.
+
+    Unlike ``mido.MidiFile`` no message objects are built: the track chunks are
+    scanned byte by byte, only note on/off messages and tempo changes are kept,
+    and absolute ticks and seconds are computed for every note event. Rows are
+    ordered by track and then by position in the track.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    return parse_midi_notes(data)
+
+
+def parse_midi_notes(data):
+    """Decodes the note messages of an in-memory standard MIDI file; see ``read_midi_notes``."""
+    if data[:4] != b"MThd":
+        raise ValueError("Not a standard MIDI file")
+    header_length = int.from_bytes(data[4:8], "big")
+    n_tracks = int.from_bytes(data[10:12], "big")
+    division = int.from_bytes(data[12:14], "big")
+
+    columns = ([], [], [], [], [], [])  # track, tick, delta, note, velocity, on
+    tempo_changes = []
+
+    pos = 8 + header_length
+    track = 0
+    while track < n_tracks and pos + 8 <= len(data):
+        chunk_type = data[pos:pos + 4]
+        chunk_length = int.from_bytes(data[pos + 4:pos + 8], "big")
+        pos += 8
+        if chunk_type == b"MTrk":
+            _parse_track(data, pos, pos + chunk_length, track, columns, tempo_changes)
+            track += 1
+        pos += chunk_length
+
+    events = np.empty(len(columns[0]), dtype=NOTE_EVENT_DTYPE)
+    for name, values in zip(("track", "tick", "delta", "note", "velocity", "on"), columns):
+        events[name] = values
+    events["seconds"] = ticks_to_seconds(events["tick"], tempo_changes, division)
+    return MidiNotes(events, track, division)
+
+
+def _parse_track(data, pos, end, track, columns, tempo_changes):
+    tracks, ticks, deltas, notes, velocities, ons = columns
+    tick = 0
+    last_tick = 0
+    status = 0
+
+    while pos < end:
+        delta = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            delta = (delta << 7) | (byte & 0x7F)
+            if byte < 0x80:
+                break
+        tick += delta
+
+        byte = data[pos]
+        if byte >= 0x80:
+            status = byte
+            pos += 1
+        elif not status:
+            raise ValueError(f"Running status without a preceding status byte at offset {pos}")
+
+        if status == 0xFF:
+            meta_type = data[pos]
+            length, pos = _read_varlen(data, pos + 1)
+            if meta_type == 0x51 and length == 3:
+                tempo_changes.append((tick, int.from_bytes(data[pos:pos + 3], "big")))
+            pos += length
+            status = 0
+        elif status in (0xF0, 0xF7):
+            length, pos = _read_varlen(data, pos)
+            pos += length
+            status = 0
+        else:
+            kind = status >> 4
+            if kind in (0x8, 0x9):
+                note, velocity = data[pos], data[pos + 1]
+                tracks.append(track)
+                ticks.append(tick)
+                deltas.append(tick - last_tick)
+                notes.append(note)
+                velocities.append(velocity)
+                ons.append(kind == 0x9 and velocity > 0)
+            pos += _DATA_LENGTHS.get(kind, 0)
+        last_tick = tick
+
+
+def _read_varlen(data, pos):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, pos
+
+
+def ticks_to_seconds(ticks, tempo_changes, division):
+    """Converts absolute ticks to seconds using the file's tempo map."""
+    ticks = np.asarray(ticks, dtype=np.int64)
+    if division & 0x8000:
+        # SMPTE timing: -frames per second in the high byte, ticks per frame in the low byte
+        frames_per_second = 256 - (division >> 8)
+        return ticks / float(frames_per_second * (division & 0xFF))
+
+    changes = sorted(tempo_changes)
+    change_ticks = np.array([0] + [tick for tick, _ in changes], dtype=np.int64)
+    tempos = np.array([DEFAULT_TEMPO] + [tempo for _, tempo in changes], dtype=np.float64)
+    seconds_per_tick = tempos / 1e6 / division
+    # Seconds elapsed at each tempo change
+    change_seconds = np.concatenate(([0.0], np.cumsum(np.diff(change_ticks) * seconds_per_tick[:-1])))
+
+    segment = np.searchsorted(change_ticks, ticks, side="right") - 1
+    return change_seconds[segment] + (ticks - change_ticks[segment]) * seconds_per_tick[segment]
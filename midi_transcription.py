@@ -0,0 +1,100 @@
+import os
+import subprocess
+import threading
+
+MIDI_DIR = "midi"
+PITCHED_STEMS = ("guitar", "bass", "piano", "other")
+
+
+def midi_path_for(wav_file):
+    """Returns where basic-pitch writes the MIDI transcription of a stem WAV."""
+    midi_output_dir = os.path.join(os.path.dirname(wav_file), MIDI_DIR)
+    return os.path.join(midi_output_dir, os.path.basename(wav_file).replace(".wav", "_basic_pitch.mid"))
+
+
+def pitched_stems(stem_dir):
+    """Lists the stem WAVs of a separated song that are worth transcribing to MIDI."""
+    return [os.path.join(stem_dir, f"{stem}.wav") for stem in PITCHED_STEMS
+            if os.path.isfile(os.path.join(stem_dir, f"{stem}.wav"))]
+
+
+def run_basic_pitch_cli(wav_files, midi_output_dir):
+    """Transcribes WAV files with a single basic-pitch CLI run."""
+    command = ["basic-pitch", midi_output_dir, *wav_files, "--save-midi"]
+    subprocess.run(command, check=True)
+
+
+class BasicPitchEngine:
+    """Transcribes stems to MIDI with a basic-pitch model loaded once per process.
+
+    All stems handed to ``transcribe`` go through one ``predict_and_save`` call
+    and end up as ``midi/<stem>_basic_pitch.mid`` next to the WAVs, exactly like
+    the CLI. When basic-pitch cannot be imported in-process, the stems are
+    transcribed with one CLI run instead of one run per stem.
+    """
+
+    def __init__(self):
+        self.model = None
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        from basic_pitch import ICASSP_2022_MODEL_PATH
+        from basic_pitch.inference import Model
+
+        print("🔄 Loading basic-pitch model...")
+        model = Model(ICASSP_2022_MODEL_PATH)
+        print("✅ basic-pitch model loaded")
+        return model
+
+    def transcribe(self, wav_files):
+        """Transcribes every WAV that has no MIDI yet and returns {wav_file: midi_file}."""
+        midi_files = {wav_file: midi_path_for(wav_file) for wav_file in wav_files}
+        pending = [wav_file for wav_file, midi_file in midi_files.items() if not os.path.exists(midi_file)]
+
+        by_dir = {}
+        for wav_file in pending:
+            by_dir.setdefault(os.path.dirname(midi_files[wav_file]), []).append(wav_file)
+
+        for midi_output_dir, batch in by_dir.items():
+            os.makedirs(midi_output_dir, exist_ok=True)
+            print(f"🔄 Converting {len(batch)} stem(s) to MIDI: {', '.join(os.path.basename(f) for f in batch)}")
+            self._predict(batch, midi_output_dir)
+
+        for wav_file, midi_file in midi_files.items():
+            if not os.path.exists(midi_file):
+                print(f"❌ Error: No MIDI file was created for {wav_file}.")
+                midi_files[wav_file] = None
+        return midi_files
+
+    def _predict(self, wav_files, midi_output_dir):
+        try:
+            from basic_pitch.inference import predict_and_save
+        except ImportError:
+            run_basic_pitch_cli(wav_files, midi_output_dir)
+            return
+
+        with self._lock:
+            if self.model is None:
+                self.model = self._load_model()
+            predict_and_save(
+                wav_files,
+                midi_output_dir,
+                save_midi=True,
+                sonify_midi=False,
+                save_model_outputs=False,
+                save_notes=False,
+                model_or_model_path=self.model,
+            )
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_midi_engine():
+    """Returns the process-wide basic-pitch engine."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = BasicPitchEngine()
+        return _engine
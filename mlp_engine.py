@@ -0,0 +1,171 @@
+"""Exports the trained chord MLP to plain .npy files and runs it without scikit-learn.
+
+    python mlp_engine.py export [--model model/chord_classifier.pkl] [--encoder model/notes_encoder.pkl] [--weights float16]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+MLP_BUNDLE_PATH = "model/chord_classifier.mlp"
+MANIFEST = "manifest.json"
+# Storage formats for the weights; float16 and int8 are computed in float32
+WEIGHT_FORMATS = ("float64", "float32", "float16", "int8")
+
+ACTIVATIONS = {
+    "identity": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "tanh": lambda x: np.tanh(x, out=x),
+    "logistic": lambda x: np.reciprocal(1 + np.exp(-x, out=x), out=x),
+}
+
+
+def quantize_int8(weights):
+    """Quantizes a weight matrix symmetrically to int8 with one scale per output column."""
+    scales = np.abs(weights).max(axis=0) / 127
+    scales[scales == 0] = 1
+    return np.round(weights / scales).astype(np.int8), scales.astype(np.float32)
+
+
+def export_mlp(model, encoder, path=MLP_BUNDLE_PATH, source_fingerprint=None, weight_format="float64"):
+    """Writes an MLPClassifier's weights, biases and labels, plus the encoder's note classes, as .npy files.
+
+    The bundle is a folder of one array per file and a JSON manifest, written
+    next to the final path and moved into place so readers never see half of it.
+    ``weight_format`` is one of ``WEIGHT_FORMATS``; int8 weights are stored
+    with per-column scales, and biases stay float32 for the reduced formats.
+    """
+    if model.out_activation_ not in ("softmax", "logistic"):
+        raise ValueError(f"Unsupported output activation '{model.out_activation_}'")
+    if weight_format not in WEIGHT_FORMATS:
+        raise ValueError(f"Unsupported weight format '{weight_format}'")
+    compute_dtype = np.float64 if weight_format == "float64" else np.float32
+    staging = path.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    digest = hashlib.sha256()
+    for i, (weights, biases) in enumerate(zip(model.coefs_, model.intercepts_)):
+        if weight_format == "int8":
+            weights, scales = quantize_int8(weights)
+            np.save(os.path.join(staging, f"S{i}.npy"), scales)
+        weights = np.ascontiguousarray(weights, dtype=np.int8 if weight_format == "int8" else weight_format)
+        biases = np.ascontiguousarray(biases, dtype=compute_dtype)
+        np.save(os.path.join(staging, f"W{i}.npy"), weights)
+        np.save(os.path.join(staging, f"b{i}.npy"), biases)
+        digest.update(weights.tobytes())
+        digest.update(biases.tobytes())
+    np.save(os.path.join(staging, "classes.npy"), np.asarray(model.classes_).astype(str))
+    np.save(os.path.join(staging, "note_classes.npy"), np.asarray(encoder.classes_, dtype=np.int64))
+    with open(os.path.join(staging, MANIFEST), "w") as f:
+        json.dump({
+            "layers": len(model.coefs_),
+            "activation": model.activation,
+            "out_activation": model.out_activation_,
+            "weight_format": weight_format,
+            "dtype": np.dtype(compute_dtype).name,
+            "hidden_layers": [int(weights.shape[0]) for weights in model.coefs_[1:]],
+            "weights_sha256": digest.hexdigest(),
+            "source_fingerprint": source_fingerprint,
+        }, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    return path
+
+
+def read_manifest(path=MLP_BUNDLE_PATH):
+    """Returns a bundle's manifest, or None when there is no bundle at ``path``."""
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class MLPEngine:
+    """Forward pass of an exported MLP as plain NumPy matmuls.
+
+    The weight files are memory-mapped read-only, so loading costs a few
+    ``open`` calls and every process using the same bundle shares one copy of
+    the weights through the page cache. ``predict`` takes the same 0/1 note
+    feature rows as the scikit-learn model and returns the same labels.
+    """
+
+    def __init__(self, path=MLP_BUNDLE_PATH):
+        manifest = read_manifest(path)
+        if manifest is None:
+            raise FileNotFoundError(f"No MLP bundle at {path}")
+        self.path = path
+        self.manifest = manifest
+        layers = range(manifest["layers"])
+        self.weights = [np.load(os.path.join(path, f"W{i}.npy"), mmap_mode="r") for i in layers]
+        self.biases = [np.load(os.path.join(path, f"b{i}.npy"), mmap_mode="r") for i in layers]
+        self.scales = ([np.load(os.path.join(path, f"S{i}.npy"), mmap_mode="r") for i in layers]
+                       if manifest.get("weight_format") == "int8" else None)
+        self.classes_ = np.load(os.path.join(path, "classes.npy")).astype(object)
+        self.note_classes = np.load(os.path.join(path, "note_classes.npy"))
+        self.activation = ACTIVATIONS[manifest["activation"]]
+        self.dtype = np.dtype(manifest["dtype"])
+
+    def decision_function(self, features):
+        """Returns the output-layer pre-activations for a (n, n_features) matrix."""
+        hidden = np.asarray(features, dtype=self.dtype)
+        last = len(self.weights) - 1
+        for i, (weights, biases) in enumerate(zip(self.weights, self.biases)):
+            hidden = np.matmul(hidden, weights, dtype=self.dtype)
+            if self.scales is not None:
+                hidden *= self.scales[i]
+            hidden += biases
+            if i < last:
+                hidden = self.activation(hidden)
+        return hidden
+
+    def nbytes(self):
+        """Returns the size of the weights, biases and scales, i.e. what the bundle maps into memory."""
+        arrays = self.weights + self.biases + (self.scales or [])
+        return sum(array.nbytes for array in arrays)
+
+    def predict_proba(self, features):
+        """Returns class probabilities, as ``MLPClassifier.predict_proba``."""
+        logits = self.decision_function(features)
+        if self.manifest["out_activation"] == "logistic":
+            positive = 1 / (1 + np.exp(-logits[:, 0]))
+            return np.column_stack([1 - positive, positive])
+        logits -= logits.max(axis=1, keepdims=True)
+        np.exp(logits, out=logits)
+        return logits / logits.sum(axis=1, keepdims=True)
+
+    def predict(self, features):
+        """Returns the predicted label of every row; softmax is monotonic, so argmax of the logits suffices."""
+        logits = self.decision_function(features)
+        if self.manifest["out_activation"] == "logistic":
+            return self.classes_[(logits[:, 0] > 0).astype(np.int64)]
+        return self.classes_[logits.argmax(axis=1)]
+
+
+def main():
+    from chord_cache import file_fingerprint
+    from classifier import CHORD_MODEL_PATH, NOTES_ENCODER_PATH
+
+    parser = argparse.ArgumentParser(description="Export the chord MLP for the NumPy inference engine")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--model", default=CHORD_MODEL_PATH)
+    parser.add_argument("--encoder", default=NOTES_ENCODER_PATH)
+    parser.add_argument("--out", default=MLP_BUNDLE_PATH)
+    parser.add_argument("--weights", choices=WEIGHT_FORMATS, default="float64", help="storage format of the weights")
+    args = parser.parse_args()
+
+    import joblib
+
+    model, encoder = joblib.load(args.model), joblib.load(args.encoder)
+    path = export_mlp(model, encoder, args.out, source_fingerprint=file_fingerprint(args.model, args.encoder),
+                      weight_format=args.weights)
+    print(f"✅ Exported {len(model.coefs_)} layers and {len(model.classes_)} classes to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from midi_analysis import analyze_midi
+from midi_transcription import PITCHED_STEMS, get_midi_engine, midi_path_for
+from previews import encode_previews
+from separation import separate_audio, stem_dir_for
+from transcription import transcribe_lyrics
+
+PIPELINE_WORKERS = int(os.environ.get("TRACKAI_PIPELINE_WORKERS", os.cpu_count() or 2))
+
+
+class Stage:
+    """One node of a pipeline DAG: a picklable function, its arguments and the stages it waits for.
+
+    ``local`` stages run on a thread of the calling process instead of the process
+    pool, for work that should reuse a model already resident in that process.
+    """
+
+    def __init__(self, name, func, *args, after=(), local=False, **kwargs):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.after = tuple(after)
+        self.local = local
+
+    @property
+    def kind(self):
+        """The stage's kind, its name without the stem suffix, e.g. "midi" for "midi:guitar"."""
+        return self.name.split(":", 1)[0]
+
+
+class Pipeline:
+    """A declarative DAG of stages that runs every stage as soon as its inputs are ready.
+
+    Independent branches run concurrently, so the wall time of a run approaches
+    the length of the critical path. A failed stage skips everything downstream
+    of it but lets unrelated branches finish.
+    """
+
+    def __init__(self, stages):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.after if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle through stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].after:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def without(self, done):
+        """Returns the pipeline left once the stages named in ``done`` have finished, e.g. to resume a run."""
+        return Pipeline([Stage(stage.name, stage.func, *stage.args, local=stage.local,
+                               after=[dep for dep in stage.after if dep not in done], **stage.kwargs)
+                         for stage in self.stages.values() if stage.name not in done])
+
+    def run(self, executor, local_executor=None, progress=None, events=None, executors=None):
+        """Runs the DAG and returns {"results", "errors", "timings", "wall_time", "broken"}.
+
+        ``events(kind, **data)`` is told when each stage starts, finishes, fails or is skipped.
+        ``executors`` maps stage kinds to their own pools, overriding ``executor`` and ``local_executor``.
+        """
+        events = events or (lambda kind, **data: None)
+        local_executor = local_executor or executor
+        executors = executors or {}
+        pending = dict(self.stages)
+        running = {}
+        results, errors, timings = {}, {}, {}
+        broken = False
+        started = time.perf_counter()
+
+        while pending or running:
+            for name, stage in list(pending.items()):
+                failed = [dep for dep in stage.after if dep in errors]
+                if failed:
+                    errors[name] = f"Skipped because {', '.join(failed)} failed"
+                    del pending[name]
+                    events("stage_skipped", stage=name, error=errors[name])
+                elif all(dep in results for dep in stage.after):
+                    target = executors.get(stage.kind) or (local_executor if stage.local else executor)
+                    running[target.submit(_timed_call, stage.func, stage.args, stage.kwargs)] = name
+                    del pending[name]
+                    events("stage_started", stage=name)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], timings[name] = future.result()
+                    print(f"✅ Stage {name} finished in {timings[name]:.1f}s")
+                    events("stage_finished", stage=name, seconds=round(timings[name], 2))
+                except BrokenExecutor as e:
+                    broken = True
+                    errors[name] = f"Worker process died: {e}"
+                    print(f"❌ Stage {name} failed: {errors[name]}")
+                    events("stage_failed", stage=name, error=errors[name])
+                except Exception as e:
+                    errors[name] = str(e)
+                    print(f"❌ Stage {name} failed: {e}")
+                    events("stage_failed", stage=name, error=errors[name])
+                if progress:
+                    finished = len(results) + len(errors)
+                    progress(finished / len(self.stages), f"{name} {'failed' if name in errors else 'finished'}")
+
+        return {"results": results, "errors": errors, "timings": timings,
+                "wall_time": time.perf_counter() - started, "broken": broken}
+
+
+def _timed_call(func, args, kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def separate_stage(file_path):
+    """Pipeline stage: separates a song into stems."""
+    output_path = separate_audio(file_path)
+    if not output_path:
+        raise FileNotFoundError(f"File {file_path} not found.")
+    return output_path
+
+
+def transcribe_stage(wav_file):
+    """Pipeline stage: transcribes one stem to MIDI; stems the model did not produce are skipped."""
+    if not os.path.exists(wav_file):
+        return None
+    return get_midi_engine().transcribe([wav_file])[wav_file]
+
+
+def analyze_stage(wav_file):
+    """Pipeline stage: extracts chords and notes from a stem's MIDI."""
+    midi_file = midi_path_for(wav_file)
+    if not os.path.exists(midi_file):
+        return None
+    return analyze_midi(midi_file, wav_file)
+
+
+def lyrics_stage(vocals_file, language):
+    """Pipeline stage: transcribes the lyrics of the vocals stem."""
+    if not os.path.exists(vocals_file):
+        return None
+    return transcribe_lyrics(vocals_file, language)
+
+
+def preview_stage(stem_dir):
+    """Pipeline stage: encodes the compact previews the output page plays."""
+    return encode_previews(stem_dir)
+
+
+def song_pipeline(file_path, language="en", lyrics=True):
+    """Builds the DAG for one song: separation, then previews and per-stem MIDI and analysis alongside lyrics."""
+    stem_dir = stem_dir_for(file_path)
+    stages = [Stage("separate", separate_stage, file_path, local=True),
+              Stage("previews", preview_stage, stem_dir, after=["separate"])]
+    for stem in PITCHED_STEMS:
+        wav_file = os.path.join(stem_dir, f"{stem}.wav")
+        stages.append(Stage(f"midi:{stem}", transcribe_stage, wav_file, after=["separate"]))
+        stages.append(Stage(f"analyze:{stem}", analyze_stage, wav_file, after=[f"midi:{stem}"]))
+    if lyrics:
+        stages.append(Stage("lyrics", lyrics_stage, os.path.join(stem_dir, "vocals.wav"), language, after=["separate"]))
+    return Pipeline(stages)
+
+
+_executor = None
+_local_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executors():
+    """Returns the shared process pool and the thread pool used for local stages."""
+    global _executor, _local_executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned workers start from a clean interpreter rather than a fork of a threaded web process
+            _executor = ProcessPoolExecutor(PIPELINE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            _local_executor = ThreadPoolExecutor(2, thread_name_prefix="pipeline-local")
+        return _executor, _local_executor
+
+
+def reset_executors():
+    """Shuts the shared process pool down so the next run starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def run_song_pipeline(file_path, language="en", lyrics=True, progress=None, events=None):
+    """Runs the whole processing DAG for one song on the shared pools."""
+    executor, local_executor = get_executors()
+    summary = song_pipeline(file_path, language, lyrics).run(executor, local_executor, progress, events)
+    if summary["broken"]:
+        reset_executors()
+    return summary
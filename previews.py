@@ -0,0 +1,140 @@
+"""Compact MP3 previews of the separated stems, for playback in the browser.
+
+A 44.1 kHz stereo 16-bit stem WAV streams at about 1411 kbit/s; its preview at
+PREVIEW_BITRATE_KBPS (96 by default) is roughly 15 times smaller. Previews are
+written to ``<stem_dir>/preview/<stem>.mp3`` with lameenc, the MP3 encoder demucs
+already depends on, right after separation.
+"""
+import os
+import queue
+import threading
+import wave
+from concurrent.futures import Future
+
+PREVIEW_DIR = "preview"
+PREVIEW_BITRATE_KBPS = int(os.environ.get("TRACKAI_PREVIEW_BITRATE_KBPS", 96))
+PREVIEW_QUALITY = 5  # LAME speed/quality trade-off, 2 = best, 7 = fastest
+FRAMES_PER_BLOCK = 1 << 16
+
+# Stem WAVs this process is encoding right now, so page views and pipeline stages never encode one twice at once
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def preview_path(wav_file):
+    """Returns where the MP3 preview of a stem WAV is stored."""
+    name = os.path.splitext(os.path.basename(wav_file))[0]
+    return os.path.join(os.path.dirname(wav_file), PREVIEW_DIR, f"{name}.mp3")
+
+
+def has_preview(wav_file):
+    """Checks whether a stem has a preview at least as new as its WAV."""
+    path = preview_path(wav_file)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(wav_file)
+
+
+def encode_preview(wav_file, bitrate_kbps=PREVIEW_BITRATE_KBPS):
+    """Encodes a 16-bit PCM WAV to an MP3 preview block by block and returns its path."""
+    import lameenc
+
+    path = preview_path(wav_file)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(wav_file, 'rb') as reader:
+        if reader.getsampwidth() != 2:
+            raise ValueError(f"{wav_file} is not 16-bit PCM")
+        encoder = lameenc.Encoder()
+        encoder.set_bit_rate(bitrate_kbps)
+        encoder.set_in_sample_rate(reader.getframerate())
+        encoder.set_channels(reader.getnchannels())
+        encoder.set_quality(PREVIEW_QUALITY)
+
+        # Unique per writer, as another process (a pipeline stage) may be encoding the same stem
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.partial"
+        try:
+            with open(temp, 'wb') as f:
+                for block in iter(lambda: reader.readframes(FRAMES_PER_BLOCK), b''):
+                    f.write(encoder.encode(block))
+                f.write(encoder.flush())
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+    os.replace(temp, path)
+    return path
+
+
+def encode_previews(stem_dir, bitrate_kbps=PREVIEW_BITRATE_KBPS):
+    """Encodes a preview of every stem of a song that lacks an up-to-date one and is not being encoded already."""
+    encoded = []
+    for name in sorted(os.listdir(stem_dir)):
+        wav_file = os.path.join(stem_dir, name)
+        if not name.endswith(".wav") or name.endswith("mono.wav") or has_preview(wav_file):
+            continue
+        key = os.path.abspath(wav_file)
+        with _in_flight_lock:
+            if key in _in_flight:
+                continue
+            _in_flight.add(key)
+        try:
+            encoded.append(encode_preview(wav_file, bitrate_kbps))
+        finally:
+            with _in_flight_lock:
+                _in_flight.discard(key)
+    if encoded:
+        print(f"🎧 Encoded {len(encoded)} preview(s) for {os.path.basename(stem_dir)}")
+    return encoded
+
+
+class PreviewEncoder:
+    """Encodes previews on a background thread, one song at a time, so separation jobs return immediately."""
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._queued = {}
+        self._queued_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="preview-encoder", daemon=True)
+        self._thread.start()
+
+    def submit(self, stem_dir):
+        """Queues a song's stems for preview encoding and returns a Future resolving to the files written.
+
+        A song already queued or being encoded is not queued again; its pending Future is returned.
+        """
+        key = os.path.abspath(stem_dir)
+        with self._queued_lock:
+            future = self._queued.get(key)
+            if future is None:
+                future = self._queued[key] = Future()
+                future.add_done_callback(lambda _: self._forget(key))
+                self._jobs.put((stem_dir, future))
+        return future
+
+    def _forget(self, key):
+        with self._queued_lock:
+            self._queued.pop(key, None)
+
+    def _run(self):
+        while True:
+            stem_dir, future = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = encode_previews(stem_dir)
+            except BaseException as e:
+                print(f"⚠️ Preview encoding failed for {stem_dir}: {e}")
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_preview_encoder():
+    """Returns the process-wide background preview encoder."""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = PreviewEncoder()
+        return _encoder
@@ -0,0 +1,145 @@
+import os
+import time
+
+import numpy as np
+
+from chord_masks import ChordMasks
+from classifier import UNKNOWN_CHORD, get_classifier, predict_chords
+
+LIVE_SAMPLE_RATE = int(os.environ.get("TRACKAI_LIVE_SAMPLE_RATE", 22050))
+MIN_SAMPLE_RATE, MAX_SAMPLE_RATE = 8000, 192000
+# A chord label is produced every LIVE_FRAME_MS from the last LIVE_WINDOW_MS of audio
+LIVE_FRAME_MS = float(os.environ.get("TRACKAI_LIVE_FRAME_MS", 100))
+LIVE_WINDOW_MS = float(os.environ.get("TRACKAI_LIVE_WINDOW_MS", 370))
+LIVE_LATENCY_BUDGET_MS = float(os.environ.get("TRACKAI_LIVE_LATENCY_MS", 200))
+
+MIN_NOTE, MAX_NOTE = 28, 96  # E1..C7, the range the note detector listens to
+NOTE_THRESHOLD = 0.25  # fraction of the strongest note's energy a note needs to count
+MAX_NOTES = 6
+NOTE_DECAY = 0.5  # weight of the previous frames in the rolling note buffer
+SILENCE_RMS = 1e-3
+LABEL_MEMO_SIZE = 4096
+
+
+class LiveChordRecognizer:
+    """Turns a live mono audio stream into chord labels, one per frame.
+
+    Incoming samples go into a rolling audio buffer. Every ``frame_ms`` the last
+    ``window_ms`` of audio are Fourier-transformed, the spectrum is folded onto
+    MIDI notes and blended into a rolling note-energy buffer, and the strongest
+    notes form a chord mask that the trained chord classifier labels. When input
+    arrives faster than it can be analyzed, stale frames are skipped and only
+    the newest one is labelled, so the delay never exceeds one frame plus one
+    analysis. Labels of note sets already seen are memoized.
+    """
+
+    def __init__(self, classifier=None, sample_rate=LIVE_SAMPLE_RATE, frame_ms=LIVE_FRAME_MS,
+                 window_ms=LIVE_WINDOW_MS, latency_budget_ms=LIVE_LATENCY_BUDGET_MS):
+        if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"Sample rate {sample_rate} Hz is outside {MIN_SAMPLE_RATE}-{MAX_SAMPLE_RATE} Hz")
+        if frame_ms >= latency_budget_ms:
+            raise ValueError(f"A {frame_ms:.0f} ms frame cannot meet a {latency_budget_ms:.0f} ms latency budget")
+        self.classifier = classifier or get_classifier()
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.latency_budget_ms = latency_budget_ms
+        self.hop = max(1, int(sample_rate * frame_ms / 1000))
+        self.window = max(self.hop, int(sample_rate * window_ms / 1000))
+
+        self.taper = np.hanning(self.window).astype(np.float32)
+        n_fft = 1 << (self.window - 1).bit_length()
+        frequencies = np.fft.rfftfreq(n_fft, 1 / sample_rate)[1:]
+        notes = np.rint(69 + 12 * np.log2(frequencies / 440.0)).astype(np.int64)
+        in_range = (notes >= MIN_NOTE) & (notes <= MAX_NOTE)
+        self.n_fft = n_fft
+        self.bins = np.flatnonzero(in_range) + 1
+        self.bin_notes = notes[in_range] - MIN_NOTE
+        # Higher notes span more FFT bins; averaging keeps them from outweighing low ones
+        self.bins_per_note = np.maximum(np.bincount(self.bin_notes, minlength=MAX_NOTE - MIN_NOTE + 1), 1)
+
+        self.buffer = np.zeros(self.window, dtype=np.float32)
+        self.energy = np.zeros(MAX_NOTE - MIN_NOTE + 1)
+        self.pending = 0
+        self.samples_seen = 0
+        self.last_chord = None
+        self.labels = {}
+
+    def reset(self):
+        """Forgets the audio and notes heard so far."""
+        self.buffer[:] = 0
+        self.energy[:] = 0
+        self.pending = 0
+        self.samples_seen = 0
+        self.last_chord = None
+
+    def feed_pcm16(self, data):
+        """Feeds little-endian 16-bit mono PCM bytes; see ``feed``."""
+        return self.feed(np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0)
+
+    def feed(self, samples):
+        """Feeds float samples in [-1, 1] and returns the results of the frames they complete.
+
+        Each result is a dict with the stream ``time`` in seconds, the detected
+        ``notes``, the ``chord`` label, whether it ``changed`` and the analysis
+        ``latency_ms``. At most one result is returned per call.
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples) >= self.window:
+            self.buffer[:] = samples[-self.window:]
+        elif len(samples):
+            self.buffer[:-len(samples)] = self.buffer[len(samples):]
+            self.buffer[-len(samples):] = samples
+        self.samples_seen += len(samples)
+        self.pending += len(samples)
+        if self.pending < self.hop:
+            return []
+        # Frames that completed while we were busy are skipped: only the newest one is labelled
+        self.pending %= self.hop
+        return [self._analyze()]
+
+    def _analyze(self):
+        started = time.perf_counter()
+        notes = self._detect_notes()
+        chord = self._label(notes)
+        changed, self.last_chord = chord != self.last_chord, chord
+        return {
+            "time": round((self.samples_seen - self.pending) / self.sample_rate, 3),
+            "notes": notes,
+            "chord": chord,
+            "changed": changed,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def _detect_notes(self):
+        frame = self.buffer
+        if np.sqrt(np.mean(frame ** 2)) < SILENCE_RMS:
+            self.energy *= NOTE_DECAY
+            return []
+        spectrum = np.abs(np.fft.rfft(frame * self.taper, self.n_fft))
+        note_energy = np.bincount(self.bin_notes, weights=spectrum[self.bins], minlength=len(self.energy))
+        note_energy /= self.bins_per_note
+        self.energy = NOTE_DECAY * self.energy + (1 - NOTE_DECAY) * note_energy
+
+        energy = self.energy.copy()
+        # Octave, twelfth and double-octave overtones of a stronger lower note are not notes of their own
+        for interval, weight in ((12, 0.5), (19, 0.33), (24, 0.25)):
+            energy[interval:] -= weight * self.energy[:-interval]
+        peak = energy.max()
+        if peak <= 0:
+            return []
+        candidates = np.flatnonzero(energy >= NOTE_THRESHOLD * peak)
+        strongest = candidates[np.argsort(energy[candidates])[::-1][:MAX_NOTES]]
+        return sorted((strongest + MIN_NOTE).tolist())
+
+    def _label(self, notes):
+        if not notes:
+            return UNKNOWN_CHORD
+        masks = ChordMasks.from_chords([notes])
+        key = masks.to_ints()[0]
+        label = self.labels.get(key)
+        if label is None:
+            if len(self.labels) >= LABEL_MEMO_SIZE:
+                self.labels.clear()
+            label = str(predict_chords(self.classifier.model, self.classifier.encoder, masks)[0])
+            self.labels[key] = label
+        return label
@@ -0,0 +1,348 @@
+import math
+import os
+import queue
+import subprocess
+import threading
+import wave
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from artifacts import get_artifact_index
+
+DEFAULT_MODEL = "htdemucs_6s"
+OUTPUT_DIR = "output"
+SEPARATION_WORKER = os.environ.get("TRACKAI_SEPARATION_WORKER", "1") == "1"
+# Songs longer than two windows are separated window by window; 0 separates every file in one go
+CHUNK_SECONDS = float(os.environ.get("TRACKAI_SEPARATION_CHUNK_SECONDS", 60))
+CHUNK_OVERLAP_SECONDS = float(os.environ.get("TRACKAI_SEPARATION_CHUNK_OVERLAP", 2))
+CHUNK_WORKERS = int(os.environ.get("TRACKAI_SEPARATION_CHUNK_WORKERS", 1))
+
+
+def track_name(file_path):
+    """Returns the folder name Demucs uses for a track, i.e. its file name without extension."""
+    return os.path.basename(file_path).rsplit(".", 1)[0]
+
+
+def stem_dir_for(file_path, model=DEFAULT_MODEL, output_dir=OUTPUT_DIR):
+    """Returns the folder holding the stems and all other artifacts derived from a song.
+
+    The folder is named after the content hash of the audio, so identical files
+    share it whatever they are called. Songs separated before content addressing
+    keep using their file-name folder.
+    """
+    output_path = os.path.join(output_dir, model, file_path.replace(".mp3", "").replace(".wav", ""))
+    legacy_path = output_path.replace(os.path.sep + "songs" + os.path.sep, os.path.sep)
+
+    digest = get_artifact_index().digest(file_path)
+    if digest is None:
+        return legacy_path
+    shared_path = os.path.join(output_dir, model, digest)
+    if not os.path.isdir(shared_path) and os.path.isdir(legacy_path) and os.listdir(legacy_path):
+        return legacy_path
+    return shared_path
+
+
+def is_separated(file_path, model=DEFAULT_MODEL, output_dir=OUTPUT_DIR):
+    """Checks whether a song already has separated stems on disk."""
+    output_path = stem_dir_for(file_path, model, output_dir)
+    return os.path.exists(output_path) and bool(os.listdir(output_path))
+
+
+def run_demucs_cli(file_path, model=DEFAULT_MODEL, output_dir=OUTPUT_DIR, device="cpu", stem_dir=None):
+    """Separates a file by shelling out to the demucs CLI (one interpreter and model load per call)."""
+    folder = os.path.basename(stem_dir) if stem_dir else track_name(file_path)
+    command = [
+        "demucs", "-n", model,
+        "-d", device,
+        "--out", output_dir,
+        "--filename", folder + "/{stem}.{ext}",
+        file_path
+    ]
+    subprocess.run(command, check=True)
+    return os.path.join(output_dir, model, folder)
+
+
+class SeparationWorker:
+    """Long-lived Demucs worker that keeps the separation model loaded.
+
+    Jobs are submitted through an in-process queue and run one at a time on a
+    background thread, which loads the model once and reuses it for every song.
+    Stems are written as ``<stem_dir>/<stem>.wav``, the same layout as the
+    demucs CLI.
+
+    Recordings longer than two ``chunk_seconds`` windows are streamed: the input
+    is decoded in overlapping windows, each window is normalized with the whole
+    track's statistics, separated on its own (``chunk_workers`` at a time) and
+    crossfaded into the stems as soon as it is done, so memory stays bounded by
+    the window size rather than the track.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, device="cpu", shifts=1, overlap=0.25, chunk_seconds=CHUNK_SECONDS,
+                 chunk_overlap=CHUNK_OVERLAP_SECONDS, chunk_workers=CHUNK_WORKERS):
+        self.model_name = model
+        self.device = device
+        self.shifts = shifts
+        self.overlap = overlap
+        self.chunk_seconds = chunk_seconds
+        self.chunk_overlap = chunk_overlap
+        self.chunk_workers = max(1, chunk_workers)
+        self.model = None
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="demucs-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path, stem_dir):
+        """Queues a file for separation into ``stem_dir`` and returns a Future resolving to that folder."""
+        future = Future()
+        self._jobs.put((file_path, stem_dir, future))
+        return future
+
+    def separate(self, file_path, stem_dir):
+        """Separates a file and blocks until its stems are written."""
+        return self.submit(file_path, stem_dir).result()
+
+    def preload(self):
+        """Loads the separation model ahead of the first job."""
+        self.submit(None, None).result()
+
+    def close(self):
+        """Stops the worker once the jobs already queued have finished."""
+        self._jobs.put(None)
+
+    def _load_model(self):
+        from demucs.pretrained import get_model
+
+        print(f"🔄 Loading Demucs model {self.model_name}...")
+        model = get_model(self.model_name)
+        model.to(self.device)
+        model.eval()
+        print(f"✅ Demucs model {self.model_name} loaded")
+        return model
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            file_path, stem_dir, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if self.model is None:
+                    self.model = self._load_model()
+                result = self._separate(file_path, stem_dir) if file_path else None
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def _separate(self, file_path, stem_dir):
+        import torch
+        from demucs.apply import apply_model
+        from demucs.audio import AudioFile, save_audio
+
+        model = self.model
+        audio = AudioFile(file_path)
+        if self.chunk_seconds and audio.duration() > 2 * self.chunk_seconds:
+            return self._separate_streaming(audio, stem_dir)
+
+        wav = audio.read(streams=0, samplerate=model.samplerate, channels=model.audio_channels)
+        ref = wav.mean(0)
+        wav = (wav - ref.mean()) / ref.std()
+
+        with torch.no_grad():
+            sources = apply_model(model, wav[None], device=self.device, shifts=self.shifts, split=True,
+                                  overlap=self.overlap, progress=False)[0]
+        sources = sources * ref.std() + ref.mean()
+
+        os.makedirs(stem_dir, exist_ok=True)
+        for source, name in zip(sources, model.sources):
+            save_audio(source.cpu(), os.path.join(stem_dir, f"{name}.wav"), samplerate=model.samplerate)
+        return stem_dir
+
+    def _reference_stats(self, audio):
+        """Returns the mean and std of the whole track's mono mix, decoded window by window."""
+        model = self.model
+        total = total_squares = 0.0
+        count = 0
+        seek_time = 0.0
+        while seek_time < audio.duration():
+            wav = audio.read(seek_time=seek_time, duration=self.chunk_seconds, streams=0,
+                             samplerate=model.samplerate, channels=model.audio_channels)
+            if not wav.shape[-1]:
+                break
+            ref = wav.mean(0).double()
+            total += ref.sum().item()
+            total_squares += (ref * ref).sum().item()
+            count += ref.numel()
+            seek_time += self.chunk_seconds
+        mean = total / max(count, 1)
+        return mean, math.sqrt(max(total_squares / max(count, 1) - mean * mean, 0.0)) + 1e-8
+
+    def _separate_window(self, audio, seek_time, mean, std):
+        import torch
+        from demucs.apply import apply_model
+
+        model = self.model
+        wav = audio.read(seek_time=seek_time, duration=self.chunk_seconds, streams=0,
+                         samplerate=model.samplerate, channels=model.audio_channels)
+        if not wav.shape[-1]:
+            return None
+        # Every window is normalized with the whole track's statistics, as the single-pass path does
+        with torch.no_grad():
+            sources = apply_model(model, ((wav - mean) / std)[None], device=self.device, shifts=self.shifts,
+                                  split=True, overlap=self.overlap, progress=False)[0]
+        return (sources * std + mean).cpu().numpy()
+
+    def _separate_streaming(self, audio, stem_dir):
+        """Separates a long recording window by window, appending crossfaded windows to the stem WAVs."""
+        model = self.model
+        overlap = int(self.chunk_overlap * model.samplerate)
+        hop = self.chunk_seconds - self.chunk_overlap
+        n_windows = max(1, math.ceil((audio.duration() - self.chunk_overlap) / hop))
+        print(f"🔄 Streaming separation in {n_windows} windows of {self.chunk_seconds:.0f}s")
+        mean, std = self._reference_stats(audio)
+
+        # Stems are assembled next to the final folder so a crash never leaves it half written
+        partial_dir = stem_dir.rstrip(os.sep) + ".partial"
+        os.makedirs(partial_dir, exist_ok=True)
+        writers = [_StemWriter(os.path.join(partial_dir, f"{name}.wav"), model.samplerate, model.audio_channels)
+                   for name in model.sources]
+        tail = None
+        try:
+            with ThreadPoolExecutor(self.chunk_workers, thread_name_prefix="demucs-window") as pool:
+                # At most chunk_workers windows are in flight; they are appended in order
+                in_flight = deque()
+                for window in range(n_windows):
+                    in_flight.append(pool.submit(self._separate_window, audio, window * hop, mean, std))
+                    if len(in_flight) >= self.chunk_workers:
+                        tail = _append_window(writers, in_flight.popleft().result(), tail, overlap)
+                while in_flight:
+                    tail = _append_window(writers, in_flight.popleft().result(), tail, overlap)
+            if tail is not None:
+                for writer, source in zip(writers, tail):
+                    writer.write(source)
+            for writer in writers:
+                writer.finish()
+        finally:
+            for writer in writers:
+                writer.discard()
+        if os.path.isdir(stem_dir):
+            os.rmdir(stem_dir)
+        os.replace(partial_dir, stem_dir)
+        return stem_dir
+
+
+def _append_window(writers, sources, tail, overlap):
+    """Crossfades a separated window into the previous window's tail and writes all but its own tail."""
+    import numpy as np
+
+    if sources is None:
+        return tail
+    if tail is not None:
+        n = min(tail.shape[-1], sources.shape[-1])
+        fade_in = np.linspace(0.0, 1.0, n, dtype=np.float32)
+        sources[..., :n] = tail[..., :n] * (1 - fade_in) + sources[..., :n] * fade_in
+    keep = max(sources.shape[-1] - overlap, 0)
+    for writer, source in zip(writers, sources):
+        writer.write(source[..., :keep])
+    return sources[..., keep:].copy()
+
+
+class _StemWriter:
+    """Streams a stem to a 16-bit WAV rescaled like demucs' ``save_audio`` (``clip='rescale'``).
+
+    The rescaling depends on the peak of the whole stem, so samples are first
+    appended as raw float32 next to the WAV and converted block by block once
+    the last window is in, keeping memory bounded by the block size.
+    """
+
+    FRAMES_PER_BLOCK = 1 << 16
+
+    def __init__(self, path, samplerate, channels):
+        self.path = path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.raw_path = path + ".f32"
+        self.peak = 0.0
+        self._raw = open(self.raw_path, 'wb')
+
+    def write(self, samples):
+        """Appends (channels, samples) float audio."""
+        import numpy as np
+
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.size:
+            self.peak = max(self.peak, float(np.abs(samples).max()))
+        self._raw.write(samples.T.tobytes())
+
+    def finish(self):
+        """Writes the WAV, scaled down as a whole when its peak would clip."""
+        import numpy as np
+
+        self._raw.close()
+        scale = 1 / max(1.01 * self.peak, 1)
+        block_bytes = self.FRAMES_PER_BLOCK * self.channels * 4
+        with open(self.raw_path, 'rb') as raw, wave.open(self.path, 'wb') as writer:
+            writer.setnchannels(self.channels)
+            writer.setsampwidth(2)
+            writer.setframerate(self.samplerate)
+            for block in iter(lambda: raw.read(block_bytes), b''):
+                samples = np.frombuffer(block, dtype=np.float32) * scale
+                writer.writeframes((samples * (2 ** 15 - 1)).astype("<i2").tobytes())
+
+    def discard(self):
+        """Drops the raw samples."""
+        self._raw.close()
+        if os.path.exists(self.raw_path):
+            os.remove(self.raw_path)
+
+
+def start_worker(model=DEFAULT_MODEL, device="cpu"):
+    """Starts a separation worker, or returns None when demucs cannot be imported in-process."""
+    try:
+        import demucs.pretrained  # noqa: F401
+    except ImportError:
+        print("⚠️ Demucs is not importable in-process, falling back to the demucs CLI.")
+        return None
+    return SeparationWorker(model, device)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    """Returns the process-wide separation worker, or None when it is disabled or unavailable."""
+    global _worker
+    with _worker_lock:
+        if _worker is None and SEPARATION_WORKER:
+            _worker = start_worker() or False
+        return _worker or None
+
+
+def separate_audio(file_path, model=DEFAULT_MODEL, output_dir=OUTPUT_DIR, device="cpu"):
+    """Runs Demucs to separate audio sources from a given file if it hasn't been separated yet."""
+    output_path = stem_dir_for(file_path, model, output_dir)
+
+    if os.path.exists(output_path) and os.listdir(output_path):
+        print(f"✅ Audio already separated: {output_path}")
+        return output_path  # Skip processing if the folder already exists with files
+
+    if not os.path.exists(file_path):
+        print(f"❌ Error: File {file_path} not found.")
+        return None
+
+    print(f"🔄 Running Demucs on {file_path} using model {model}...")
+
+    worker = get_worker()
+    if worker is not None and model == worker.model_name and device == worker.device:
+        try:
+            worker.separate(file_path, output_path)
+        except Exception as e:
+            print(f"⚠️ In-process separation failed ({e}), retrying with the demucs CLI...")
+            run_demucs_cli(file_path, model, output_dir, device, stem_dir=output_path)
+    else:
+        run_demucs_cli(file_path, model, output_dir, device, stem_dir=output_path)
+    print(f"✅ Separation complete. Output saved in {output_path}")
+    return output_path
@@ -0,0 +1,151 @@
+"""Songbook pages built once per song and instrument and served as static files.
+
+A songbook lines up the transcribed lyrics with an instrument's filtered
+chords. It is rendered when both inputs exist and stored in the song folder as
+``songbook/<instrument>.html`` with pre-compressed ``.gz`` (and ``.br`` when the
+brotli package is installed) copies next to it, plus a small JSON manifest
+holding the SHA-256 of the page, which doubles as its ETag. A view only stats
+the inputs to check the page is current and then reads the stored file.
+"""
+import csv
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from midi_transcription import MIDI_DIR, PITCHED_STEMS
+
+try:
+    import brotli
+except ImportError:  # pre-compressed brotli bodies are optional
+    brotli = None
+
+SONGBOOK_FORMAT = "songbook-v1"
+SONGBOOK_DIR = "songbook"
+LYRICS_FILE = "vocals_lyrics.txt"
+WORDS_PER_LINE = 8
+# Content codings stored next to each page, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+_build_lock = threading.Lock()
+
+
+def songbook_sources(stem_dir, instrument):
+    """Returns the lyrics file and the instrument's filtered chords CSV a songbook is built from."""
+    return os.path.join(stem_dir, LYRICS_FILE), os.path.join(stem_dir, MIDI_DIR, f"{instrument}_filtered_chords.csv")
+
+
+def page_path(stem_dir, instrument, encoding=None):
+    """Returns where the songbook page, or its pre-compressed copy for ``encoding``, is stored."""
+    path = os.path.join(stem_dir, SONGBOOK_DIR, f"{instrument}.html")
+    return path + ENCODINGS[encoding] if encoding else path
+
+
+def _manifest_path(stem_dir, instrument):
+    return os.path.join(stem_dir, SONGBOOK_DIR, f"{instrument}.json")
+
+
+def read_chord_labels(chords_file):
+    """Reads the predicted chord column of a filtered chords CSV."""
+    with open(chords_file, newline='', encoding='utf-8') as f:
+        return [row["Predicted Chord"] for row in csv.DictReader(f)]
+
+
+def format_songbook(lyrics, chords):
+    """Pairs every lyric line of WORDS_PER_LINE words with a line of chords aligned to the words."""
+    words = " ".join(line.strip() for line in lyrics).split()
+    # Chords beyond the last word are dropped
+    chord_positions = [" " * len(word) for word in words]
+    for i in range(min(len(chords), len(words))):
+        chord_positions[i] = chords[i].ljust(len(words[i]))
+
+    return [(" ".join(chord_positions[i:i + WORDS_PER_LINE]), " ".join(words[i:i + WORDS_PER_LINE]))
+            for i in range(0, len(words), WORDS_PER_LINE)]
+
+
+def _stat(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _read_manifest(stem_dir, instrument):
+    try:
+        with open(_manifest_path(stem_dir, instrument)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_atomic(path, data):
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, path)
+
+
+def build_songbook(stem_dir, instrument, render):
+    """Renders and stores a songbook; ``render`` turns the formatted lines into HTML.
+
+    Returns the manifest, or None when the lyrics or the chords are missing. The
+    page is only rewritten when its inputs' content changed.
+    """
+    sources = songbook_sources(stem_dir, instrument)
+    if not all(os.path.exists(path) for path in sources):
+        return None
+
+    with _build_lock:
+        stats = [_stat(path) for path in sources]
+        source_digest = hashlib.sha256(SONGBOOK_FORMAT.encode())
+        for path in sources:
+            with open(path, 'rb') as f:
+                source_digest.update(f.read())
+        source_digest = source_digest.hexdigest()
+
+        manifest = _read_manifest(stem_dir, instrument)
+        if manifest is None or manifest["source_digest"] != source_digest or not os.path.exists(
+                page_path(stem_dir, instrument)):
+            with open(sources[0], 'r', encoding='utf-8') as f:
+                lyrics = f.readlines()
+            body = render(format_songbook(lyrics, read_chord_labels(sources[1]))).encode('utf-8')
+
+            os.makedirs(os.path.join(stem_dir, SONGBOOK_DIR), exist_ok=True)
+            _write_atomic(page_path(stem_dir, instrument), body)
+            encodings = ["gzip"]
+            _write_atomic(page_path(stem_dir, instrument, "gzip"), gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write_atomic(page_path(stem_dir, instrument, "br"), brotli.compress(body, mode=brotli.MODE_TEXT))
+                encodings.insert(0, "br")
+            manifest = {"etag": hashlib.sha256(body).hexdigest(), "built": time.time(), "encodings": encodings,
+                        "source_digest": source_digest}
+            print(f"📖 Built {instrument} songbook for {os.path.basename(stem_dir)}")
+
+        manifest["sources"] = stats
+        _write_atomic(_manifest_path(stem_dir, instrument), json.dumps(manifest).encode())
+        return manifest
+
+
+def get_songbook(stem_dir, instrument, render):
+    """Returns the manifest of an up-to-date songbook, building it first when needed, or None without inputs."""
+    manifest = _read_manifest(stem_dir, instrument)
+    if manifest is not None:
+        try:
+            current = [_stat(path) for path in songbook_sources(stem_dir, instrument)]
+        except FileNotFoundError:
+            return None
+        if current == manifest.get("sources") and os.path.exists(page_path(stem_dir, instrument)):
+            return manifest
+    return build_songbook(stem_dir, instrument, render)
+
+
+def build_songbooks(stem_dir, render):
+    """Builds the songbook of every instrument whose chords exist alongside the song's lyrics."""
+    built = []
+    for instrument in PITCHED_STEMS:
+        try:
+            if build_songbook(stem_dir, instrument, render) is not None:
+                built.append(instrument)
+        except Exception as e:
+            print(f"⚠️ Could not build the {instrument} songbook for {stem_dir}: {e}")
+    return built
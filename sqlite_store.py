@@ -0,0 +1,39 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SQLiteStore:
+    """Base class for the small SQLite databases TrackAI keeps on local disk.
+
+    One connection is shared by the threads of a process and guarded by a lock;
+    separate worker processes open their own connection to the same file and
+    are serialized by SQLite's locking, with WAL so readers do not block writers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # SQLite leaves foreign keys, and so ON DELETE CASCADE, off unless asked on every connection
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+    @contextmanager
+    def transaction(self):
+        """Runs the block inside an immediate (write-locking) transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        """Closes the underlying connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from analysis_store import AnalysisStore, stem_from_csv  # noqa: E402
+
+TABLES = ("stems", "chords", "chord_notes", "notes")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AnalysisStore(str(tmp_path / "analysis.sqlite"))
+
+
+def write_stem_csvs(midi_dir, stem, chords, notes):
+    midi_dir.mkdir(parents=True, exist_ok=True)
+    rows = "".join(f'"{chord_notes}",{label}\n' for chord_notes, label in chords)
+    (midi_dir / f"{stem}_filtered_chords.csv").write_text("Notes,Predicted Chord\n" + rows, encoding='utf-8')
+    (midi_dir / f"{stem}_notes.csv").write_text("Note\n" + "".join(f"{note}\n" for note in notes), encoding='utf-8')
+
+
+def counts(store):
+    return {table: store._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLES}
+
+
+def test_stem_from_csv():
+    assert stem_from_csv("songA/midi/guitar_filtered_chords.csv", "_filtered_chords.csv") == ("songA", "guitar")
+    assert stem_from_csv("songA/bass_notes.csv", "_notes.csv") == ("songA", "bass")
+
+
+def test_save_replace_and_query(store):
+    store.save_stem("songA", "guitar", [(0, (48, 52, 55), "C"), (500000, (43, 47, 50), "G"), (900000, (48, 52, 55), "C")],
+                    [(0, 48), (0, 52), (500000, 43)])
+    store.save_stem("songB", "piano", [(0, (45, 48, 52), "Am")], [(0, 45)])
+
+    assert store.chords("songA", "guitar")[1] == ((43, 47, 50), "G", 500000)
+    assert store.notes("songB", "piano") == [(45, 0)]
+    assert store.chord_frequency(limit=1) == [("C", 2)]
+    assert store.songs_with_chord("C") == [("songA", "guitar", 2)]
+    assert store.chords_with_note(48) == [("songA", "guitar", 0, "C"), ("songA", "guitar", 900000, "C"),
+                                          ("songB", "piano", 0, "Am")]
+    assert store.chords_with_note(48, song="songB") == [("songB", "piano", 0, "Am")]
+
+    # Re-analyzing replaces the stem's rows; removing it cascades to all of them
+    store.save_stem("songA", "guitar", [(0, (50, 53, 57), "Dm")], [(0, 50)])
+    assert counts(store) == {"stems": 2, "chords": 2, "chord_notes": 6, "notes": 2}
+    store.remove_stem("songA", "guitar")
+    assert counts(store) == {"stems": 1, "chords": 1, "chord_notes": 3, "notes": 1}
+
+
+def test_migrate_imports_csvs_once(store, tmp_path):
+    output = tmp_path / "output"
+    write_stem_csvs(output / "songA" / "midi", "guitar", [("(48, 52, 55)", "C"), ("(43,)", "G5")], [48, 52, 43])
+    write_stem_csvs(output / "songB" / "midi", "bass", [], [40])
+    store.save_stem("songB", "bass", [], [(10, 40)])
+
+    assert store.migrate(str(output)) == 1
+    assert store.chords("songA", "guitar") == [((48, 52, 55), "C", None), ((43,), "G5", None)]
+    assert store.notes("songA", "guitar") == [(48, None), (52, None), (43, None)]
+    assert store.notes("songB", "bass") == [(40, 10)]  # analyzed rows are not overwritten by exports
+    assert store.migrate(str(output)) is None
+    assert store.import_csvs("songC", "guitar", str(output / "missing.csv")) is False
+
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from catalog import SongCatalog, match_query, parse_song_name  # noqa: E402
+
+SONGS = ["The Beatles - Yellow Submarine.mp3", "The Beatles - Yesterday.mp3", "Queen - Bohemian Rhapsody.mp3",
+         "Beyoncé - Halo.mp3", "demo take.wav", "notes.txt"]
+
+
+@pytest.fixture
+def library(tmp_path):
+    songs = tmp_path / "songs"
+    songs.mkdir()
+    for name in SONGS:
+        (songs / name).write_bytes(b"audio")
+    catalog = SongCatalog(str(tmp_path / "catalog.sqlite"))
+    catalog.sync(str(songs))
+    return catalog, songs
+
+
+def names(rows):
+    return [row["filename"] for row in rows]
+
+
+def test_song_names_and_queries():
+    assert parse_song_name("Queen - Bohemian Rhapsody.mp3") == ("Bohemian Rhapsody", "Queen")
+    assert parse_song_name("demo take.wav") == ("demo take", "")
+    assert match_query('yel "sub') == '"yel"* "sub"*'
+    assert match_query("  ") == ""
+
+
+def test_sync_indexes_audio_files_only(library):
+    catalog, songs = library
+    rows, total = catalog.search()
+
+    assert total == 5 and "notes.txt" not in names(rows)
+    assert catalog.sync(str(songs)) == (0, 0)
+    os.remove(songs / "demo take.wav")
+    (songs / "Queen - Bohemian Rhapsody.mp3").write_bytes(b"longer audio")
+    assert catalog.sync(str(songs)) == (1, 1)
+    assert catalog.search()[1] == 4
+
+
+def test_search_matches_word_prefixes_across_fields(library):
+    catalog, _ = library
+
+    assert sorted(names(catalog.search("beat")[0])) == SONGS[:2]
+    assert names(catalog.search("beatles yel")[0]) == [SONGS[0]]
+    assert names(catalog.search("rhap")[0]) == [SONGS[2]]
+    assert names(catalog.search("beyonce")[0]) == [SONGS[3]]
+    assert catalog.search("zeppelin") == ([], 0)
+
+
+def test_pages_list_every_song_once_in_name_order(library):
+    catalog, _ = library
+    pages = [catalog.search(page=page, per_page=2) for page in (1, 2, 3, 4)]
+
+    assert [total for _, total in pages] == [5] * 4
+    assert [len(rows) for rows, _ in pages] == [2, 2, 1, 0]
+    listed = [name for rows, _ in pages for name in names(rows)]
+    assert listed == sorted(SONGS[:5], key=str.lower)
+
+
+def test_status_follows_jobs_and_search_follows_changes(library):
+    catalog, songs = library
+    catalog.set_status("separate", "running", filename=SONGS[2], folder="abc123")
+    catalog.set_status("pipeline", "finished", folder="abc123")
+
+    song = catalog.get(SONGS[2])
+    assert (song["folder"], song["job"], song["status"]) == ("abc123", "pipeline", "finished")
+
+    catalog.remove(SONGS[2])
+    assert catalog.get(SONGS[2]) is None
+    assert catalog.search("bohemian") == ([], 0)
+    (songs / "Queen - Radio Ga Ga.mp3").write_bytes(b"audio")
+    catalog.add(str(songs / "Queen - Radio Ga Ga.mp3"))
+    assert names(catalog.search("queen")[0]) == ["Queen - Radio Ga Ga.mp3"]
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chord_cache import ChordCache  # noqa: E402
+from chord_masks import note_mask  # noqa: E402
+
+C_MAJOR, G_MAJOR, A_MINOR = note_mask((60, 64, 67)), note_mask((55, 59, 62)), note_mask((57, 60, 64))
+
+
+@pytest.fixture
+def model_files(tmp_path):
+    paths = [tmp_path / "model.pkl", tmp_path / "encoder.pkl"]
+    for path in paths:
+        path.write_bytes(b"v1")
+    return [str(path) for path in paths]
+
+
+def open_cache(tmp_path, model_files, **kwargs):
+    return ChordCache(str(tmp_path / "cache.sqlite"), model_files, **kwargs)
+
+
+def test_predictions_persist_across_instances(tmp_path, model_files):
+    cache = open_cache(tmp_path, model_files)
+    cache.put_many({C_MAJOR: "C", G_MAJOR: "G"})
+    cache.close()
+
+    cache = open_cache(tmp_path, model_files)
+    assert cache.get_many([C_MAJOR, G_MAJOR, A_MINOR]) == {C_MAJOR: "C", G_MAJOR: "G"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 2)
+
+
+def test_changed_model_file_empties_cache(tmp_path, model_files):
+    cache = open_cache(tmp_path, model_files)
+    cache.put_many({C_MAJOR: "C"})
+    cache.get_many([C_MAJOR])
+    cache.close()
+
+    with open(model_files[1], 'wb') as f:
+        f.write(b"v2")
+    cache = open_cache(tmp_path, model_files)
+    assert cache.get_many([C_MAJOR]) == {}
+    assert cache.stats()["hits"] == 0
+
+
+def test_instances_only_see_their_own_model(tmp_path, model_files):
+    old = open_cache(tmp_path, model_files)
+    with open(model_files[0], 'wb') as f:
+        f.write(b"v2")
+    new = open_cache(tmp_path, model_files)
+    new.put_many({C_MAJOR: "C"})
+    # A worker still running the old model neither reads nor clobbers the new model's entries
+    assert old.get_many([C_MAJOR]) == {}
+    old.put_many({C_MAJOR: "Cmaj7"})
+    assert new.get_many([C_MAJOR]) == {C_MAJOR: "C"}
+    assert old.get_many([C_MAJOR]) == {C_MAJOR: "Cmaj7"}
+
+
+def test_lookups_do_not_write(tmp_path, model_files):
+    cache = open_cache(tmp_path, model_files)
+    cache.put_many({C_MAJOR: "C"})
+    writer = sqlite3.connect(cache.path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        assert cache.get_many([C_MAJOR, G_MAJOR]) == {C_MAJOR: "C"}
+    finally:
+        writer.execute("ROLLBACK")
+    assert cache.stats()["hits"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, model_files):
+    cache = open_cache(tmp_path, model_files, max_entries=2)
+    cache.put_many({C_MAJOR: "C"})
+    cache.put_many({G_MAJOR: "G"})
+    cache.get_many([C_MAJOR])  # G is now the least recently used
+    cache.put_many({A_MINOR: "Am"})
+
+    assert cache.get_many([C_MAJOR, G_MAJOR, A_MINOR]) == {C_MAJOR: "C", A_MINOR: "Am"}
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chord_masks import ChordMasks, filter_similar  # noqa: E402
+from midi_analysis import group_chords, merge_notes, reconstruct_onsets  # noqa: E402
+from midi_events import read_midi_notes  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+SAMPLE_MIDI_FILES = sorted(f for f in os.listdir(DATA_DIR) if f.endswith("_basic_pitch.mid"))
+LABELS = ["C", "G", "Am", "F", "Dm"]
+
+
+# Set-based filter the mask version replaced, kept as the reference it must match
+def filter_reference(chords, labels, threshold=3):
+    kept, last_label = [], None
+    for index, (chord, label) in enumerate(zip(chords, labels)):
+        if label == last_label:
+            continue
+        if any(len(set(chords[previous]) & set(chord)) >= threshold for previous in kept[-3:]):
+            continue
+        kept.append(index)
+        last_label = label
+    return kept
+
+
+def label_of(chord):
+    # Labels depend on the notes alone, as the classifier's do
+    return LABELS[sum(note * 7 for note in chord) % len(LABELS)]
+
+
+def random_chords(rng, count):
+    # Few distinct notes and labels, so repetitions and overlaps are frequent
+    chords = [tuple(sorted(rng.choice(np.arange(40, 56), rng.integers(1, 6), replace=False).tolist()))
+              for _ in range(count)]
+    for i in rng.choice(np.arange(1, count), count // 5, replace=False):
+        chords[i] = chords[i - 1]
+    return chords
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_filter_similar_matches_set_rule(seed):
+    rng = np.random.default_rng(seed)
+    chords = random_chords(rng, 500)
+    labels = [label_of(chord) for chord in chords]
+
+    assert filter_similar(ChordMasks.from_chords(chords), labels) == filter_reference(chords, labels)
+
+
+@pytest.mark.parametrize("midi_name", SAMPLE_MIDI_FILES)
+def test_filter_similar_matches_set_rule_on_sample_midi(midi_name):
+    events = read_midi_notes(os.path.join(DATA_DIR, midi_name)).events
+    masks = group_chords(reconstruct_onsets(events, merge_notes(events)))
+    chords = masks.tuples()
+    labels = [label_of(chord) for chord in chords]
+
+    assert filter_similar(masks, labels) == filter_reference(chords, labels)
+
+
+def test_masks_round_trip():
+    chords = [(0,), (60, 64, 67), (63, 64, 127), ()]
+    masks = ChordMasks.from_chords(chords + [(128, -1, 60)])
+
+    assert masks[:4].tuples() == chords
+    assert masks[4:].tuples() == [(60,)]
+    assert ChordMasks.from_ints(masks.to_ints()).tuples() == masks.tuples()
+    assert masks[:4].sizes().tolist() == [1, 3, 3, 0]
+    assert masks[1:2].overlap(ChordMasks.from_chords([(60, 63, 64)])).tolist() == [2]
+
+
+def test_filter_similar_of_no_chords():
+    assert filter_similar(ChordMasks.from_chords([]), []) == []
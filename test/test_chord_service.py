@@ -0,0 +1,74 @@
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import chord_service  # noqa: E402
+from chord_masks import ChordMasks  # noqa: E402
+from chord_service import ChordService, ChordServiceClient  # noqa: E402
+
+LABELS = ["C", "G", "Am", "F", "Dm"]
+CLIENTS = 8
+
+
+class NotesClassifier:
+    """Labels chords from their notes alone and counts its calls, standing in for the chord model."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, chords):
+        self.calls += 1
+        masks = chords if isinstance(chords, ChordMasks) else ChordMasks.from_chords(chords)
+        return [LABELS[sum(chord) % len(LABELS)] for chord in masks.tuples()]
+
+
+def song_chords(i):
+    return [(40 + i, 44 + i, 47 + i), (50 + i,), (38 + i, 42 + i)]
+
+
+@pytest.fixture
+def service(tmp_path):
+    # A long wait so every concurrent request lands in the first batch
+    service = ChordService(str(tmp_path / "chords.sock"), batch_size=1024, max_wait_ms=500,
+                           classifier=NotesClassifier()).start()
+    yield service
+    service.shutdown()
+
+
+def test_concurrent_requests_share_one_batch(service):
+    barrier = threading.Barrier(CLIENTS)
+    results = {}
+
+    def request(i):
+        client = ChordServiceClient(service.path)
+        barrier.wait()
+        results[i] = client.predict(song_chords(i))
+        client.close()
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert service.batcher.stats() == {"requests": CLIENTS, "chords": 3 * CLIENTS, "batches": 1}
+    assert service.batcher.classifier.calls == 1
+    in_process = NotesClassifier()
+    assert results == {i: in_process.predict(song_chords(i)) for i in range(CLIENTS)}
+
+
+def test_predict_falls_back_without_a_service(tmp_path):
+    missing = str(tmp_path / "missing.sock")
+    assert chord_service.predict(song_chords(0), path=missing) is None
+
+    # A socket file left behind by a service that is gone
+    stale = str(tmp_path / "stale.sock")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(stale)
+    sock.close()
+    assert chord_service.predict(song_chords(0), path=stale) is None
@@ -0,0 +1,90 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue  # noqa: E402
+
+
+def echo(payload, progress):
+    progress(0.5, "Halfway")
+    return {"echo": payload["value"]}
+
+
+def fail(payload, progress):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite")
+
+
+def open_queue(path):
+    return JobQueue(path, {"echo": echo, "fail": fail}, workers=1)
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def claim_as(queue, job_id, owner):
+    with queue.transaction() as conn:
+        conn.execute("UPDATE jobs SET state = ?, owner = ? WHERE id = ?", (RUNNING, owner, job_id))
+
+
+def test_identical_pending_job_is_reused(queue_path):
+    queue = open_queue(queue_path)
+    job_id = queue.enqueue("echo", {"value": 1})
+
+    assert queue.enqueue("echo", {"value": 1}) == job_id
+    assert queue.enqueue("echo", {"value": 2}) != job_id
+    assert queue.run_next() and queue.get(job_id)["state"] == DONE
+    # Once finished, the same request queues a new job
+    assert queue.enqueue("echo", {"value": 1}) != job_id
+
+
+def test_jobs_record_results_and_failures(queue_path):
+    queue = open_queue(queue_path)
+    ok, bad = queue.enqueue("echo", {"value": "x"}), queue.enqueue("fail", {})
+    while queue.run_next():
+        pass
+
+    assert queue.get(ok)["state"] == DONE and queue.get(ok)["result"] == {"echo": "x"}
+    assert queue.get(bad)["state"] == FAILED and queue.get(bad)["error"] == "boom"
+    assert not queue.run_next()
+    with pytest.raises(ValueError):
+        queue.enqueue("unknown", {})
+
+
+def test_jobs_of_dead_processes_are_requeued_on_start(queue_path):
+    queue = open_queue(queue_path)
+    host = socket.gethostname()
+    orphan, alive, elsewhere = (queue.enqueue("echo", {"value": i}) for i in range(3))
+    claim_as(queue, orphan, f"{host}:{dead_pid()}")
+    claim_as(queue, alive, f"{host}:{os.getppid()}")
+    claim_as(queue, elsewhere, "other-host:1")
+    queue.close()
+
+    # Opening the queue touches nothing; only the process that starts workers re-queues
+    queue = open_queue(queue_path)
+    assert queue.get(orphan)["state"] == RUNNING
+    assert sorted(queue.requeue_orphans()) == sorted([orphan, elsewhere])
+    assert queue.get(orphan)["state"] == QUEUED
+    assert queue.get(alive)["state"] == RUNNING
+
+
+def test_start_is_idempotent(queue_path):
+    queue = open_queue(queue_path)
+    queue.start()
+    queue.start()
+    try:
+        assert len(queue._threads) == 1
+    finally:
+        queue.stop()
@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pipeline import Pipeline, Stage  # noqa: E402
+
+
+class Recorder:
+    """Stage functions that log the order in which they run."""
+
+    def __init__(self):
+        self.ran = []
+        self._lock = threading.Lock()
+
+    def step(self, name):
+        with self._lock:
+            self.ran.append(name)
+        return name.upper()
+
+    def fail(self, name):
+        self.step(name)
+        raise RuntimeError(f"{name} broke")
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(4) as executor:
+        yield executor
+
+
+def run(pipeline, executor):
+    events = []
+    summary = pipeline.run(executor, events=lambda kind, **data: events.append((kind, data["stage"])))
+    return summary, events
+
+
+def test_stages_run_after_their_dependencies(executor):
+    recorder = Recorder()
+    pipeline = Pipeline([
+        Stage("merge", recorder.step, "merge", after=["left", "right"]),
+        Stage("left", recorder.step, "left", after=["source"]),
+        Stage("right", recorder.step, "right", after=["source"]),
+        Stage("source", recorder.step, "source"),
+    ])
+    summary, events = run(pipeline, executor)
+
+    assert summary["results"] == {"source": "SOURCE", "left": "LEFT", "right": "RIGHT", "merge": "MERGE"}
+    assert summary["errors"] == {} and not summary["broken"]
+    for name, stage in pipeline.stages.items():
+        assert all(recorder.ran.index(dep) < recorder.ran.index(name) for dep in stage.after)
+        started = events.index(("stage_started", name))
+        assert all(events.index(("stage_finished", dep)) < started for dep in stage.after)
+
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    recorder = Recorder()
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([Stage("a", recorder.step, "a", after=["c"]), Stage("b", recorder.step, "b", after=["a"]),
+                  Stage("c", recorder.step, "c", after=["b"])])
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([Stage("a", recorder.step, "a", after=["a"])])
+    with pytest.raises(ValueError, match="unknown stage"):
+        Pipeline([Stage("a", recorder.step, "a", after=["missing"])])
+    assert recorder.ran == []
+
+
+def test_failure_skips_downstream_stages_only(executor):
+    recorder = Recorder()
+    pipeline = Pipeline([
+        Stage("source", recorder.step, "source"),
+        Stage("broken", recorder.fail, "broken", after=["source"]),
+        Stage("downstream", recorder.step, "downstream", after=["broken"]),
+        Stage("last", recorder.step, "last", after=["downstream"]),
+        Stage("sibling", recorder.step, "sibling", after=["source"]),
+    ])
+    summary, events = run(pipeline, executor)
+
+    assert summary["results"] == {"source": "SOURCE", "sibling": "SIBLING"}
+    assert summary["errors"]["broken"] == "broken broke"
+    assert summary["errors"]["downstream"] == "Skipped because broken failed"
+    assert summary["errors"]["last"] == "Skipped because downstream failed"
+    assert "downstream" not in recorder.ran and "last" not in recorder.ran
+    assert ("stage_failed", "broken") in events and ("stage_skipped", "last") in events
+
+
+def test_without_resumes_after_finished_stages(executor):
+    recorder = Recorder()
+    pipeline = Pipeline([Stage("source", recorder.step, "source"),
+                         Stage("next", recorder.step, "next", after=["source"])])
+    summary, _ = run(pipeline.without({"source"}), executor)
+
+    assert summary["results"] == {"next": "NEXT"}
+    assert recorder.ran == ["next"]
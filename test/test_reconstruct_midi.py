@@ -0,0 +1,145 @@
+import os
+import shutil
+import sys
+
+import mido
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from midi_analysis import (MERGE_THRESHOLD_MS, TIME_THRESHOLD_MS, group_chords, merge_notes,  # noqa: E402
+                           process_midi, read_onsets, reconstruct_midi, reconstruct_onsets)
+from midi_events import read_midi_notes  # noqa: E402
+
+# Sample basic-pitch transcriptions: a guitar stem, a dense piano stem and a two-track bass stem
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+SAMPLE_MIDI_FILES = sorted(f for f in os.listdir(DATA_DIR) if f.endswith("_basic_pitch.mid"))
+
+
+def absolute_ms(midi_file, track):
+    # The samples keep the default tempo, so absolute ticks convert at a single rate
+    tick = 0
+    for msg in track:
+        tick += msg.time
+        yield round(tick * (500000 / 1e6 / midi_file.ticks_per_beat) * 1e3), msg
+
+
+# Original message-by-message process_midi, with absolute milliseconds in place of delta ticks
+def process_midi_reference(midi_path, processed_path):
+    midi_file = mido.MidiFile(midi_path)
+    filtered_midi = mido.MidiFile()
+
+    for track in midi_file.tracks:
+        new_track = mido.MidiTrack()
+        note_ranges = {}
+
+        for time, msg in absolute_ms(midi_file, track):
+            if msg.type == "note_on" and msg.velocity > 0:
+                if msg.note in note_ranges:
+                    last_note = note_ranges[msg.note]
+                    if time - last_note['end_time'] <= MERGE_THRESHOLD_MS:
+                        last_note['end_time'] = time
+                    else:
+                        note_ranges[msg.note] = {'start_time': time, 'end_time': time}
+                else:
+                    note_ranges[msg.note] = {'start_time': time, 'end_time': time}
+
+            elif msg.type == "note_off" or (msg.type == "note_on" and msg.velocity == 0):
+                if msg.note in note_ranges:
+                    note_ranges[msg.note]['end_time'] = time
+
+        for note, times in note_ranges.items():
+            new_track.append(mido.Message("note_on", note=note, velocity=64, time=times['start_time']))
+            new_track.append(mido.Message("note_off", note=note, velocity=0, time=times['end_time']))
+
+        filtered_midi.tracks.append(new_track)
+
+    filtered_midi.save(processed_path)
+    return processed_path
+
+
+# Original nested-loop implementation, kept as the reference the linear version must match
+def reconstruct_midi_reference(original_midi, processed_midi, reconstructed_path):
+    original_midi_file = mido.MidiFile(original_midi)
+    processed_midi_file = mido.MidiFile(processed_midi)
+    reconstructed_midi = mido.MidiFile()
+
+    original_sequence = [msg.note for track in original_midi_file.tracks for msg in track if
+                         msg.type == "note_on" and msg.velocity > 0]
+    processed_notes = [msg for track in processed_midi_file.tracks for msg in track if
+                       msg.type == "note_on" and msg.velocity > 0]
+
+    new_track = mido.MidiTrack()
+    note_map = {}
+
+    for note in original_sequence:
+        for msg in processed_notes:
+            if msg.note == note and note not in note_map:
+                note_map[note] = msg
+                break
+
+    for note in original_sequence:
+        if note in note_map:
+            msg_on = note_map[note]
+            msg_off = mido.Message("note_off", note=note, velocity=0, time=msg_on.time + 200)
+            new_track.append(msg_on)
+            new_track.append(msg_off)
+
+    reconstructed_midi.tracks.append(new_track)
+    reconstructed_midi.save(reconstructed_path)
+    return reconstructed_path
+
+
+# Original detect_chords grouping, with TIME_THRESHOLD_MS
+def chords_reference(midi_path):
+    chords = []
+    current_chord = []
+    current_time = 0
+
+    for track in mido.MidiFile(midi_path).tracks:
+        for msg in track:
+            if msg.type == "note_on" and msg.velocity > 0:
+                if current_chord and (msg.time - current_time > TIME_THRESHOLD_MS):
+                    chords.append(tuple(sorted(set(current_chord))))
+                    current_chord = []
+                current_chord.append(msg.note)
+                current_time = msg.time
+
+    if current_chord:
+        chords.append(tuple(sorted(set(current_chord))))
+    return chords
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture(params=SAMPLE_MIDI_FILES)
+def midi_file(request, tmp_path):
+    path = str(tmp_path / request.param)
+    shutil.copy(os.path.join(DATA_DIR, request.param), path)
+    return path
+
+
+def test_process_midi_matches_reference(tmp_path, midi_file):
+    expected = process_midi_reference(midi_file, str(tmp_path / "expected_processed.mid"))
+
+    assert read_bytes(process_midi(midi_file)) == read_bytes(expected)
+
+
+def test_reconstruct_midi_matches_reference(tmp_path, midi_file):
+    processed_midi = process_midi(midi_file)
+    reconstructed = reconstruct_midi(midi_file, processed_midi)
+    expected = reconstruct_midi_reference(midi_file, processed_midi, str(tmp_path / "expected.mid"))
+
+    assert read_bytes(reconstructed) == read_bytes(expected)
+
+
+def test_in_memory_pass_matches_reconstructed_midi(midi_file):
+    reconstructed = reconstruct_midi(midi_file, process_midi(midi_file))
+    events = read_midi_notes(midi_file).events
+    onsets = reconstruct_onsets(events, merge_notes(events))
+
+    assert onsets.tolist() == read_onsets(reconstructed).tolist()
+    assert group_chords(onsets).tuples() == chords_reference(reconstructed)
@@ -0,0 +1,243 @@
+"""TrackAI command line.
+
+    python trackai.py batch <folder or manifest> [--lyrics] [--separate-workers 1] [--midi-workers 2] ...
+
+``batch`` processes every song of a folder, or every path listed in a manifest
+(one per line, relative to the manifest, ``#`` starts a comment), without the
+web interface: separation, previews, MIDI conversion, chord and note analysis
+and optionally lyrics. Each kind of stage runs on its own process pool, so the
+slow separation of one song overlaps the MIDI conversion and analysis of others.
+Finished stages are recorded as they complete; running the same command again
+only runs the stages that were skipped, failed or interrupted.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from catalog import AUDIO_EXTENSIONS
+from sqlite_store import SQLiteStore
+
+BATCH_DB_PATH = os.environ.get("TRACKAI_BATCH_DB", "cache/batch.sqlite")
+# Default process pool size of each stage kind
+STAGE_WORKERS = {
+    "separate": 1,
+    "previews": 1,
+    "midi": 2,
+    "analyze": max((os.cpu_count() or 2) // 2, 1),
+    "lyrics": 1,
+}
+
+
+def collect_songs(source):
+    """Returns the audio files of a folder, or the paths listed in a manifest file."""
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.lower().endswith(AUDIO_EXTENSIONS))
+    songs = []
+    with open(source, encoding='utf-8') as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                songs.append(os.path.normpath(os.path.join(os.path.dirname(source), line)))
+    return songs
+
+
+class BatchState(SQLiteStore):
+    """Which stages of which songs a batch finished, so an interrupted or failed batch can be resumed."""
+
+    def __init__(self, path=BATCH_DB_PATH):
+        super().__init__(path)
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS songs (
+                    file_path TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stages (
+                    file_path TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    seconds REAL NOT NULL,
+                    PRIMARY KEY (file_path, stage)
+                ) WITHOUT ROWID
+            """)
+
+    def done_stages(self, file_path):
+        """Returns the names of the stages of a song that already finished."""
+        with self._lock:
+            return {stage for stage, in self._conn.execute("SELECT stage FROM stages WHERE file_path = ?",
+                                                            (os.path.abspath(file_path),))}
+
+    def record_stage(self, file_path, stage, seconds):
+        """Marks one stage of a song as finished."""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO stages (file_path, stage, seconds) VALUES (?, ?, ?)",
+                         (os.path.abspath(file_path), stage, seconds))
+
+    def set_status(self, file_path, status, error=None):
+        """Records the outcome of a song: "running", "finished" or "failed"."""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO songs (file_path, status, error, updated_at) VALUES (?, ?, ?, ?)",
+                         (os.path.abspath(file_path), status, error, time.time()))
+
+    def reset(self, file_path):
+        """Forgets a song's finished stages so it is processed from scratch."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM stages WHERE file_path = ?", (os.path.abspath(file_path),))
+            conn.execute("DELETE FROM songs WHERE file_path = ?", (os.path.abspath(file_path),))
+
+
+def process_song(file_path, state, pools, language="en", lyrics=False):
+    """Runs the stages of one song not finished by an earlier batch; returns the pipeline summary or None."""
+    from pipeline import song_pipeline
+
+    pipeline = song_pipeline(file_path, language, lyrics)
+    pipeline = pipeline.without(state.done_stages(file_path) & set(pipeline.stages))
+    if not pipeline.stages:
+        return None
+
+    def events(kind, stage, **data):
+        if kind == "stage_finished":
+            state.record_stage(file_path, stage, data["seconds"])
+
+    state.set_status(file_path, "running")
+    summary = pipeline.run(None, executors=pools, events=events)
+    errors = summary["errors"]
+    state.set_status(file_path, "failed" if errors else "finished",
+                     "; ".join(f"{name}: {error}" for name, error in errors.items()) or None)
+    return summary
+
+
+def throughput_summary(summaries, wall_time, total, already_done):
+    """Aggregates the per-song pipeline summaries of a batch into songs per hour and time per stage kind."""
+    finished = sum(1 for summary in summaries.values() if not summary["errors"])
+    stages = {}
+    for summary in summaries.values():
+        for name, seconds in summary["timings"].items():
+            kind = stages.setdefault(name.split(":", 1)[0], {"runs": 0, "seconds": 0.0})
+            kind["runs"] += 1
+            kind["seconds"] += seconds
+    for kind in stages.values():
+        kind["mean_seconds"] = kind["seconds"] / kind["runs"]
+    return {
+        "songs": total,
+        "processed": len(summaries),
+        "finished": finished,
+        "failed": len(summaries) - finished,
+        "already_done": already_done,
+        "wall_time": wall_time,
+        "songs_per_hour": finished / wall_time * 3600 if wall_time else 0.0,
+        "stages": stages,
+    }
+
+
+def print_summary(summary):
+    print(f"\n📊 {summary['finished']} of {summary['processed']} song(s) processed in {summary['wall_time']:.0f}s "
+          f"({summary['songs_per_hour']:.1f} songs/hour); {summary['failed']} failed, "
+          f"{summary['already_done']} already done")
+    print(f"{'stage':<10}{'runs':>6}{'total s':>10}{'mean s':>9}")
+    for name, kind in summary["stages"].items():
+        print(f"{name:<10}{kind['runs']:>6}{kind['seconds']:>10.1f}{kind['mean_seconds']:>9.1f}")
+
+
+def batch(args):
+    songs = collect_songs(args.source)
+    if not songs:
+        print(f"❌ No songs found in {args.source}")
+        return 1
+
+    state = BatchState(args.state)
+    if args.force:
+        for file_path in songs:
+            state.reset(file_path)
+
+    workers = {kind: getattr(args, f"{kind}_workers") for kind in STAGE_WORKERS}
+    context = multiprocessing.get_context("spawn")
+    pools = {kind: ProcessPoolExecutor(count, mp_context=context) for kind, count in workers.items()}
+    print(f"🚀 Processing {len(songs)} song(s), {args.songs} at a time, with "
+          + ", ".join(f"{count} {kind}" for kind, count in workers.items()) + " worker(s)")
+
+    summaries, already_done = {}, 0
+    broken = threading.Event()
+    started = time.perf_counter()
+
+    def run(file_path):
+        if broken.is_set():
+            return None
+        return process_song(file_path, state, pools, args.language, args.lyrics)
+
+    songs_pool = ThreadPoolExecutor(args.songs, thread_name_prefix="batch-song")
+    try:
+        futures = {songs_pool.submit(run, file_path): file_path for file_path in songs}
+        for done, future in enumerate(as_completed(futures), 1):
+            file_path = futures[future]
+            name = os.path.basename(file_path)
+            try:
+                summary = future.result()
+            except Exception as e:
+                state.set_status(file_path, "failed", str(e))
+                print(f"❌ [{done}/{len(songs)}] {name} failed: {e}")
+                continue
+            if summary is None:
+                already_done += not broken.is_set()
+                print(f"⏭️ [{done}/{len(songs)}] {name} {'not started' if broken.is_set() else 'already done'}")
+                continue
+            summaries[file_path] = summary
+            if summary["broken"]:
+                broken.set()
+            elapsed = time.perf_counter() - started
+            finished = sum(1 for s in summaries.values() if not s["errors"])
+            failed = [stage for stage, error in summary["errors"].items() if not error.startswith("Skipped")]
+            outcome = f"failed in {', '.join(failed)}" if summary["errors"] else "finished"
+            print(f"{'❌' if summary['errors'] else '✅'} [{done}/{len(songs)}] {name} {outcome} in "
+                  f"{summary['wall_time']:.0f}s, {finished / elapsed * 3600:.1f} songs/hour so far")
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrupted; run the same command again to resume")
+        songs_pool.shutdown(wait=False, cancel_futures=True)
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        return 130
+    songs_pool.shutdown()
+    for pool in pools.values():
+        pool.shutdown()
+
+    summary = throughput_summary(summaries, time.perf_counter() - started, len(songs), already_done)
+    print_summary(summary)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"📝 Summary written to {args.summary}")
+    if broken.is_set():
+        print("⚠️ A worker process died; run the same command again to resume the remaining songs")
+    return 1 if summary["failed"] or broken.is_set() else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="trackai", description="TrackAI command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch_parser = commands.add_parser("batch", help="process a folder or manifest of songs without the web interface")
+    batch_parser.add_argument("source", help="folder of audio files, or a manifest listing one path per line")
+    batch_parser.add_argument("--lyrics", action="store_true", help="also transcribe the lyrics")
+    batch_parser.add_argument("--language", default="en", help="lyrics language")
+    batch_parser.add_argument("--songs", type=int, default=4, help="songs in flight at once")
+    for kind, count in STAGE_WORKERS.items():
+        batch_parser.add_argument(f"--{kind}-workers", type=int, default=count, help=f"{kind} processes")
+    batch_parser.add_argument("--state", default=BATCH_DB_PATH, help="database of finished stages")
+    batch_parser.add_argument("--force", action="store_true", help="reprocess songs finished by an earlier batch")
+    batch_parser.add_argument("--summary", help="also write the throughput summary to this JSON file")
+    args = parser.parse_args()
+
+    if args.command == "batch":
+        return batch(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Distills and quantizes the chord classifier and picks the smallest model within an accuracy budget.
+
+Student networks are trained on the teacher's labels for the training chords
+plus random note combinations, then every model (the teacher included) is
+exported to the NumPy engine in each weight format and evaluated on the
+test_model.py evaluation set. The report lists ground-truth accuracy and its
+drop relative to the teacher's, weight memory and prediction latency; with
+--deploy the smallest candidate whose drop is within --max-drop (and latency
+within --max-latency-us) replaces the engine bundle that ChordClassifier serves.
+
+    python train/compress_model.py --test-folder <midi folder> [--students "128,64;64;32"] [--max-drop 0.01] [--deploy]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import joblib
+import numpy as np
+from mido import MidiFile
+from sklearn.neural_network import MLPClassifier
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+
+from chord_cache import file_fingerprint  # noqa: E402
+from mlp_engine import MLP_BUNDLE_PATH, WEIGHT_FORMATS, MLPEngine, export_mlp  # noqa: E402
+
+MODEL_PATH = os.path.join(REPO_DIR, "model/chord_classifier.pkl")
+ENCODER_PATH = os.path.join(REPO_DIR, "model/notes_encoder.pkl")
+# Same folder as test/test_model.py
+TEST_MIDI_FOLDER = os.environ.get(
+    "TRACKAI_CHORD_TEST_MIDI",
+    "C:/Users/Mateo/Documents/UCE/2024 - 2025/mineria/7200 fichiers MIDI accords piano - Ressource/training")
+
+
+# Function to parse MIDI files the way test/test_model.py does
+def parse_midi(midi_path):
+    midi = MidiFile(midi_path)
+    parsed_data = []
+
+    for track in midi.tracks:
+        chord_name = None
+        notes = []
+        for msg in track:
+            if msg.type == 'track_name':  # Extract chord name
+                chord_name = msg.name.strip().split(" ")[-1]
+            if msg.type == 'note_on' and msg.velocity > 0:
+                notes.append(msg.note)
+
+        if chord_name and notes:
+            parsed_data.append((chord_name, sorted(notes)))
+
+    return parsed_data
+
+
+def load_chords(folder):
+    """Returns the chord labels and note lists of every MIDI file in ``folder``."""
+    chords = []
+    for file in sorted(os.listdir(folder)):
+        if file.endswith(".mid"):
+            chords.extend(parse_midi(os.path.join(folder, file)))
+    labels = np.array([label for label, _ in chords], dtype=object)
+    return labels, [notes for _, notes in chords]
+
+
+def random_chords(n_features, count, seed=0):
+    """Returns ``count`` random feature rows of two to six notes."""
+    rng = np.random.default_rng(seed)
+    features = np.zeros((count, n_features), dtype=np.int64)
+    for row, size in enumerate(rng.integers(2, 7, count)):
+        features[row, rng.choice(n_features, size, replace=False)] = 1
+    return features
+
+
+def distill(teacher, transfer, hidden_layers, seed=42):
+    """Trains a student MLP to reproduce the teacher's labels on the transfer chords."""
+    student = MLPClassifier(hidden_layer_sizes=hidden_layers, activation=teacher.activation,
+                            max_iter=500, early_stopping=True, random_state=seed)
+    return student.fit(transfer, teacher.predict(transfer))
+
+
+def per_chord_us(engine, features, repeats):
+    engine.predict(features)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        engine.predict(features)
+    return (time.perf_counter() - started) / repeats / len(features) * 1e6
+
+
+def evaluate(name, engine, X_test, y_test, repeats):
+    return {
+        "name": name,
+        "layers": engine.manifest["hidden_layers"],
+        "format": engine.manifest["weight_format"],
+        "bytes": engine.nbytes(),
+        "accuracy": float((engine.predict(X_test) == y_test).mean()),
+        "single_us": per_chord_us(engine, X_test[:1], repeats),
+        "batch_us": per_chord_us(engine, X_test, 3),
+    }
+
+
+def parse_students(value):
+    return [tuple(int(size) for size in layers.split(",")) for layers in value.split(";") if layers.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--test-folder", default=TEST_MIDI_FOLDER, help="evaluation MIDI folder of test_model.py")
+    parser.add_argument("--train-folder", help="MIDI folder whose chords join the transfer set")
+    parser.add_argument("--students", default="200,100;128,64;64;32", help="hidden layer sizes, ';' between students")
+    parser.add_argument("--formats", default="float32,float16,int8", help="weight formats to try")
+    parser.add_argument("--transfer", type=int, default=50000, help="random chords labelled by the teacher")
+    parser.add_argument("--max-drop", type=float, default=0.01, help="largest drop in ground-truth accuracy relative to the teacher")
+    parser.add_argument("--max-latency-us", type=float, help="latency budget for a single chord")
+    parser.add_argument("--repeats", type=int, default=1000)
+    parser.add_argument("--deploy", action="store_true", help=f"export the chosen model to {MLP_BUNDLE_PATH}")
+    args = parser.parse_args()
+    formats = [name for name in args.formats.split(",") if name]
+    unknown = [name for name in formats if name not in WEIGHT_FORMATS]
+    if unknown:
+        parser.error(f"unknown weight format(s): {', '.join(unknown)}")
+
+    warnings.simplefilter("ignore")
+    teacher = joblib.load(MODEL_PATH)
+    mlb = joblib.load(ENCODER_PATH)
+    fingerprint = file_fingerprint(MODEL_PATH, ENCODER_PATH)
+
+    y_test, test_notes = load_chords(args.test_folder)
+    X_test = mlb.transform(test_notes)
+    print(f"🎼 Evaluation set: {len(y_test)} chords from {args.test_folder}")
+
+    transfer = random_chords(len(mlb.classes_), args.transfer)
+    if args.train_folder:
+        transfer = np.vstack([mlb.transform(load_chords(args.train_folder)[1]), transfer])
+
+    models = [("teacher", teacher, ["float64"] + formats)]
+    for hidden_layers in parse_students(args.students):
+        started = time.perf_counter()
+        student = distill(teacher, transfer, hidden_layers)
+        print(f"🎓 Distilled student {hidden_layers} in {time.perf_counter() - started:.1f}s")
+        models.append((f"student {','.join(map(str, hidden_layers))}", student, formats))
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, model, model_formats in models:
+            for weight_format in model_formats:
+                path = export_mlp(model, mlb, os.path.join(workdir, f"{len(results)}.mlp"), fingerprint, weight_format)
+                results.append(evaluate(name, MLPEngine(path), X_test, y_test, args.repeats))
+                results[-1]["model"] = model
+
+        baseline = results[0]["accuracy"]
+        print(f"\n{'model':<18}{'format':<9}{'accuracy':>9}{'delta':>8}{'weights':>10}{'single':>10}{'batched':>12}")
+        for result in results:
+            result["delta"] = result["accuracy"] - baseline
+            print(f"{result['name']:<18}{result['format']:<9}{result['accuracy']:>9.2%}{result['delta']:>+8.2%}"
+                  f"{result['bytes'] / 1024:>8.0f}KB{result['single_us']:>8.0f}µs{result['batch_us']:>9.2f}µs/ch")
+
+        within = [result for result in results if result["delta"] >= -args.max_drop
+                  and (args.max_latency_us is None or result["single_us"] <= args.max_latency_us)]
+        if not within:
+            print("❌ No model meets the accuracy and latency budgets")
+            sys.exit(1)
+        chosen = min(within, key=lambda result: (result["bytes"], result["single_us"]))
+        print(f"\n✅ Smallest within budget: {chosen['name']} {chosen['format']} "
+              f"({chosen['bytes'] / 1024:.0f}KB, {chosen['delta']:+.2%}, {chosen['single_us']:.0f}µs per chord)")
+
+    if args.deploy:
+        export_mlp(chosen["model"], mlb, os.path.join(REPO_DIR, MLP_BUNDLE_PATH), fingerprint, chosen["format"])
+        print(f"📦 Deployed to {MLP_BUNDLE_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import gc
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_MODELS = tuple(os.environ.get("TRACKAI_WHISPER_MODELS", "base").split(","))
+WHISPER_POOL_SIZE = int(os.environ.get("TRACKAI_WHISPER_POOL_SIZE", 1))
+WHISPER_IDLE_TIMEOUT = int(os.environ.get("TRACKAI_WHISPER_IDLE_TIMEOUT", 600))
+
+
+def load_whisper_model(size, device=None):
+    """Loads a Whisper model and runs a short silent clip through it to warm it up."""
+    import whisper
+
+    print(f"🔄 Loading Whisper model '{size}'...")
+    model = whisper.load_model(size, device=device)
+    model.transcribe(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), fp16=False)
+    print(f"✅ Whisper model '{size}' loaded")
+    return model
+
+
+class _ModelSlot:
+    """Instances of one model size, handed out through a bounded queue."""
+
+    def __init__(self, size, max_instances):
+        self.size = size
+        self.max_instances = max_instances
+        self.available = queue.LifoQueue()
+        self.loaded = 0
+        self.loading = 0
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class WhisperPool:
+    """Process-wide pool of resident Whisper models.
+
+    Each configured model size is loaded at most ``instances`` times and shared
+    by all requests; callers that find every instance busy wait in a queue for
+    the next free one. Sizes nobody has used for ``idle_timeout`` seconds are
+    unloaded by a background thread so they do not pin memory.
+    """
+
+    def __init__(self, sizes=("base",), instances=1, idle_timeout=600, device=None, loader=load_whisper_model):
+        self.sizes = tuple(sizes)
+        self.idle_timeout = idle_timeout
+        self.device = device
+        self.loader = loader
+        self._slots = {size: _ModelSlot(size, instances) for size in self.sizes}
+        self._reaper = None
+        self._stopped = threading.Event()
+        if idle_timeout:
+            self._reaper = threading.Thread(target=self._reap_idle, name="whisper-reaper", daemon=True)
+            self._reaper.start()
+
+    def _slot(self, size):
+        if size not in self._slots:
+            raise ValueError(f"Whisper model '{size}' is not configured (available: {', '.join(self.sizes)})")
+        return self._slots[size]
+
+    @contextmanager
+    def model(self, size="base", timeout=None):
+        """Checks a model instance out of the pool for the duration of the block."""
+        slot = self._slot(size)
+        instance = self._acquire(slot, timeout)
+        try:
+            yield instance
+        finally:
+            with slot.lock:
+                slot.in_use -= 1
+                slot.last_used = time.monotonic()
+            slot.available.put(instance)
+
+    def _acquire(self, slot, timeout):
+        with slot.lock:
+            slot.in_use += 1
+            try:
+                return slot.available.get_nowait()
+            except queue.Empty:
+                # Instances still loading count against the limit, but are not loaded until the load returns
+                load_new = slot.loaded + slot.loading < slot.max_instances
+                if load_new:
+                    slot.loading += 1
+        try:
+            if not load_new:
+                return slot.available.get(timeout=timeout)
+            instance = self.loader(slot.size, self.device)
+        except BaseException:
+            with slot.lock:
+                slot.in_use -= 1
+                if load_new:
+                    slot.loading -= 1
+            raise
+        with slot.lock:
+            slot.loading -= 1
+            slot.loaded += 1
+        return instance
+
+    def transcribe(self, audio_path, size="base", timeout=None, **options):
+        """Transcribes an audio file with a pooled model of the given size."""
+        with self.model(size, timeout=timeout) as model:
+            return model.transcribe(audio_path, **options)
+
+    def preload(self, sizes=None):
+        """Loads and warms one instance of each given (default: every configured) size."""
+        for size in sizes or self.sizes:
+            with self.model(size):
+                pass
+
+    def unload_idle(self, now=None):
+        """Drops every loaded instance of sizes idle for longer than ``idle_timeout``."""
+        now = time.monotonic() if now is None else now
+        unloaded = []
+        for slot in self._slots.values():
+            with slot.lock:
+                if not slot.loaded or slot.in_use or now - slot.last_used < self.idle_timeout:
+                    continue
+                while True:
+                    try:
+                        slot.available.get_nowait()
+                    except queue.Empty:
+                        break
+                slot.loaded = 0
+            unloaded.append(slot.size)
+
+        if unloaded:
+            gc.collect()
+            print(f"🧹 Unloaded idle Whisper models: {', '.join(unloaded)}")
+        return unloaded
+
+    def stats(self):
+        """Returns loaded, loading and busy instance counts per model size."""
+        return {size: {"loaded": slot.loaded, "loading": slot.loading, "in_use": slot.in_use}
+                for size, slot in self._slots.items()}
+
+    def close(self):
+        """Stops the idle reaper thread."""
+        self._stopped.set()
+
+    def _reap_idle(self):
+        while not self._stopped.wait(min(self.idle_timeout, 60)):
+            self.unload_idle()
+
+
+_transcriber = None
+_transcriber_lock = threading.Lock()
+
+
+def get_transcriber():
+    """Returns the process-wide Whisper pool configured from the environment."""
+    global _transcriber
+    with _transcriber_lock:
+        if _transcriber is None:
+            _transcriber = WhisperPool(WHISPER_MODELS, instances=WHISPER_POOL_SIZE, idle_timeout=WHISPER_IDLE_TIMEOUT)
+        return _transcriber
+
+
+def transcribe_lyrics(file_path, language):
+    """Transcribes a vocals stem with Whisper and saves the text next to it."""
+    result = get_transcriber().transcribe(file_path, size=WHISPER_MODELS[0], language=language)
+
+    lyrics = result["text"]
+    if not lyrics:
+        return None
+    lyrics_file = file_path.replace('.wav', '') + "_lyrics.txt"
+    with open(lyrics_file, 'w', encoding='utf-8') as f:
+        f.write(lyrics)
+    return lyrics_file
@@ -0,0 +1,177 @@
+import os
+import sys
+import threading
+import time
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+def _split(value):
+    return tuple(name.strip() for name in value.split(",") if name.strip())
+
+
+def load_analysis():
+    """Imports the MIDI analysis stack (pandas, mido and the analysis modules)."""
+    import midi_analysis  # noqa: F401
+    import pipeline  # noqa: F401
+
+
+def load_chord_classifier():
+    """Loads the chord model, its note encoder and the prediction cache."""
+    from classifier import get_classifier
+    get_classifier()
+
+
+def load_whisper():
+    """Loads the configured Whisper models into the transcription pool."""
+    from transcription import get_transcriber
+    get_transcriber().preload()
+
+
+def load_separation():
+    """Starts the Demucs worker and loads its model."""
+    from separation import get_worker
+    worker = get_worker()
+    if worker is not None:
+        worker.preload()
+
+
+def load_chord_service():
+    """Loads the chord model and serves it to the pipeline workers over the chord service socket."""
+    from chord_service import start_service
+    load_chord_classifier()
+    start_service()
+
+
+def _loaded_global(module, name):
+    # Probes only look at modules already imported, so checking readiness never loads anything;
+    # a module still being imported on another thread may not define the global yet
+    return getattr(sys.modules.get(module), name, None)
+
+
+def analysis_loaded():
+    # pipeline imports midi_analysis and defines run_song_pipeline last
+    return _loaded_global("pipeline", "run_song_pipeline") is not None
+
+
+def chord_classifier_loaded():
+    return _loaded_global("classifier", "_classifier") is not None
+
+
+def whisper_loaded():
+    transcriber = _loaded_global("transcription", "_transcriber")
+    return transcriber is not None and all(stats["loaded"] for stats in transcriber.stats().values())
+
+
+def separation_loaded():
+    worker = _loaded_global("separation", "_worker")
+    return bool(worker) and worker.model is not None
+
+
+def chord_service_loaded():
+    return _loaded_global("chord_service", "_service") is not None and chord_classifier_loaded()
+
+
+PRELOADERS = {
+    "analysis": load_analysis,
+    "chord_classifier": load_chord_classifier,
+    "whisper": load_whisper,
+    "separation": load_separation,
+    "chord_service": load_chord_service,
+}
+
+# Whether a component was loaded, by the preloader or on first use by the code that needs it
+PROBES = {
+    "analysis": analysis_loaded,
+    "chord_classifier": chord_classifier_loaded,
+    "whisper": whisper_loaded,
+    "separation": separation_loaded,
+    "chord_service": chord_service_loaded,
+}
+
+# Components loaded in the background at startup ("all" for every one), and the ones /readyz waits for,
+# which are loaded at startup too
+PRELOAD = _split(os.environ.get("TRACKAI_PRELOAD", ""))
+PRELOAD = tuple(PRELOADERS) if PRELOAD == ("all",) else PRELOAD
+READY_REQUIRES = _split(os.environ.get("TRACKAI_READY_REQUIRES", "chord_classifier"))
+
+
+class Preloader:
+    """Loads models and heavy modules on a background thread and tracks what is ready.
+
+    Nothing is loaded at import time; the app starts serving immediately and a
+    component is loaded either on first use by the code that needs it or here,
+    ahead of time, when asked through ``start``. Each component is loaded at
+    most once per process.
+    """
+
+    def __init__(self, loaders=PRELOADERS, probes=PROBES):
+        self.loaders = dict(loaders)
+        self.probes = dict(probes)
+        self._states = {name: {"state": PENDING} for name in self.loaders}
+        self._lock = threading.Lock()
+
+    def start(self, names):
+        """Starts loading the named components not attempted yet; failed ones stay failed for /readyz to report."""
+        unknown = [name for name in names if name not in self.loaders]
+        if unknown:
+            print(f"⚠️ Unknown preload component(s): {', '.join(unknown)}")
+        with self._lock:
+            queued = [name for name in names if name in self.loaders and self._states[name]["state"] == PENDING]
+            for name in queued:
+                self._states[name] = {"state": LOADING}
+        if queued:
+            threading.Thread(target=self._load, args=(queued,), name="preload", daemon=True).start()
+        return queued
+
+    def _load(self, names):
+        for name in names:
+            started = time.perf_counter()
+            try:
+                self.loaders[name]()
+            except Exception as e:
+                state = {"state": FAILED, "error": str(e)}
+                print(f"❌ Preloading {name} failed: {e}")
+            else:
+                state = {"state": READY, "seconds": round(time.perf_counter() - started, 2)}
+                print(f"✅ Preloaded {name} in {state['seconds']}s")
+            with self._lock:
+                self._states[name] = state
+
+    def _loaded(self, name, state):
+        # A component that is pending or failed here may still have been loaded on first use
+        if state.get("state") == READY:
+            return True
+        probe = self.probes.get(name)
+        return probe is not None and probe()
+
+    def status(self):
+        """Returns the load state of every component."""
+        with self._lock:
+            states = {name: dict(state) for name, state in self._states.items()}
+        for name, state in states.items():
+            if state["state"] != READY and self._loaded(name, state):
+                states[name] = {"state": READY, "on_first_use": True}
+        return states
+
+    def ready(self, names):
+        """Checks whether all the named components are loaded, whoever loaded them."""
+        with self._lock:
+            states = {name: dict(self._states.get(name, {})) for name in names}
+        return all(self._loaded(name, state) for name, state in states.items())
+
+
+_preloader = None
+_preloader_lock = threading.Lock()
+
+
+def get_preloader():
+    """Returns the process-wide preloader."""
+    global _preloader
+    with _preloader_lock:
+        if _preloader is None:
+            _preloader = Preloader()
+        return _preloader